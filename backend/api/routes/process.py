@@ -1,17 +1,60 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from pathlib import Path
 from services.downloader import downloader
-from services.video_processing import video_processor, STYLE_MAP
-from services.transcription import transcriber
-from services.analysis import analyzer
+from services.video_processing import video_processor, STYLE_MAP, QUALITY_PROFILES
+from services.transcription import transcriber, LOCAL_MODEL_SIZE, LOCAL_COMPUTE_TYPE
+from services.analysis import analyzer, IncrementalMomentScorer, ANALYSIS_WINDOW_SECONDS, MAX_ANALYSIS_WINDOWS
+from services.jobs import job_manager, Job
+from services.rendering import render_executor, group_close_clips
+from services.artifacts import artifact_store
+from services.scenes import scene_indexer
+from services.transcript_index import TranscriptIndex
+from services.audio import is_pcm, load_pcm, energy_envelope, PCM_SUFFIX
+from services.metrics import stage_timer, HEURISTIC_FALLBACKS
+from services.ai_clients import ai_clients, ANALYSIS_HEDGE_SECONDS
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
 import os
 import json
 import re
+import shutil
+import threading
+import uuid
 
 
 router = APIRouter()
 
+# "parallel": one ffmpeg per clip on the render pool (default).
+# "batch": clips within BATCH_MAX_GAP seconds of each other share one ffmpeg decode.
+RENDER_MODE = os.getenv("RENDER_MODE", "parallel")
+BATCH_MAX_GAP = float(os.getenv("BATCH_MAX_GAP", "30"))
+
+# Start transcription on an early audio track of URL downloads: overlapped with the video
+# download for yt-dlp, decoded in-stream for the remote downloader (see VideoDownloader.start_download)
+STREAMING_INGEST = os.getenv("STREAMING_INGEST", "1") != "0"
+# Transcriptions started during a download run here, off the job worker
+transcription_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("MAX_CONCURRENT_JOBS", "2")),
+    thread_name_prefix="stt"
+)
+
+# Without an LLM, moments are scored from transcript segments as they decode, and
+# windows scoring at least STREAMING_EARLY_SCORE start rendering before transcription ends
+STREAMING_ANALYSIS = os.getenv("STREAMING_ANALYSIS", "1") != "0"
+STREAMING_EARLY_SCORE = float(os.getenv("STREAMING_EARLY_SCORE", "0.6"))
+
+# Visual scene index (cuts + motion), built next to transcription; clip starts within
+# SCENE_SNAP_SECONDS of a cut are moved onto it so shorts do not open mid-shot, and
+# the energy heuristic blends in the motion scores
+SCENE_INDEX = os.getenv("SCENE_INDEX", "1") != "0"
+SCENE_SNAP_SECONDS = float(os.getenv("SCENE_SNAP_SECONDS", "1.0"))
+
+# SSE progress stream: poll the job's event log every 0.5s, heartbeat every ~15s
+SSE_POLL_INTERVAL = 0.5
+SSE_HEARTBEAT_POLLS = 30
+
 class ProcessRequest(BaseModel):
     file_id: str = None # Optional if video_url is provided
     video_path: str = None # Optional if video_url is provided
@@ -26,24 +69,217 @@ class ProcessRequest(BaseModel):
     custom_bg_color: str = None # Expected format: #RRGGBB
     custom_size: int = None
 
+
+def build_style_string(caption_style: str, custom_color: str = None, custom_bg_color: str = None, custom_size: int = None) -> str:
+    """
+    Builds the FFmpeg force_style string for a caption preset plus the user's overrides.
+    Colors are #RRGGBB and get converted to ASS &HBBGGRR& notation.
+    """
+    final_style = STYLE_MAP.get(caption_style, STYLE_MAP["Classic"])
+
+    if custom_color:
+        # Convert #RRGGBB to &HBBGGRR&
+        hex_color = custom_color.lstrip('#')
+        if len(hex_color) == 6:
+            r = hex_color[0:2]
+            g = hex_color[2:4]
+            b = hex_color[4:6]
+            ass_color = f"&H{b}{g}{r}&" 
+            # Replace PrimaryColour
+            final_style = re.sub(r"PrimaryColour=&H[0-9A-Fa-f]+&", f"PrimaryColour={ass_color}", final_style)
+
+    if custom_bg_color:
+        # If BG Color is provided, we switch to Box style (BorderStyle=3)
+        hex_bg = custom_bg_color.lstrip('#')
+        if len(hex_bg) == 6:
+            r = hex_bg[0:2]
+            g = hex_bg[2:4]
+            b = hex_bg[4:6]
+            ass_bg_color = f"&H{b}{g}{r}&"
+            
+            # Force BorderStyle=3
+            final_style = re.sub(r"BorderStyle=\d+", "BorderStyle=3", final_style)
+            # Set Shadow=0 to avoid weird look with box
+            final_style = re.sub(r"Shadow=\d+", "Shadow=0", final_style)
+            # FFmpeg maps OutlineColour to the box color for BorderStyle=3
+            final_style = re.sub(r"OutlineColour=&H[0-9A-Fa-f]+&", f"OutlineColour={ass_bg_color}", final_style)
+
+    if custom_size:
+        # Replace Fontsize
+        final_style = re.sub(r"Fontsize=\d+", f"Fontsize={custom_size}", final_style)
+
+    return final_style
+
+
 @router.post("")
 async def process_video(request: ProcessRequest):
     """
-    Trigger full video processing pipeline:
+    Queue the full video processing pipeline on a background worker.
+    Returns a job_id immediately; poll GET /api/process/{job_id} for stage,
+    partial clips and the final result.
+    """
+    # Fail fast on a missing local file; URL downloads are validated by the worker.
+    if not request.video_url:
+        if not request.video_path or not Path(request.video_path).exists():
+            raise HTTPException(status_code=404, detail="Video file not found")
+
+    job = job_manager.submit(
+        lambda job: run_process_pipeline(request, job),
+        params=request.dict()
+    )
+    return {
+        "job_id": job.job_id,
+        "status": job.status,
+        "status_url": f"/api/process/{job.job_id}"
+    }
+
+
+@router.get("/{job_id}/events")
+async def stream_process_events(job_id: str, http_request: Request):
+    """
+    Server-Sent Events stream of a job's progress: stage changes, transcription and
+    per-clip render percentages, each finished clip, then "completed" or "failed".
+    Reconnecting clients resume after the Last-Event-ID header.
+    """
+    job = job_manager.get_live(job_id)
+    if not job:
+        snapshot = job_manager.get(job_id)
+        if not snapshot:
+            raise HTTPException(status_code=404, detail="Job not found")
+
+        # Job is not running in this worker: send its last known state once
+        async def snapshot_stream():
+            yield format_sse_event("snapshot", snapshot)
+
+        return StreamingResponse(snapshot_stream(), media_type="text/event-stream")
+
+    try:
+        last_id = int(http_request.headers.get("last-event-id", -1))
+    except ValueError:
+        last_id = -1
+
+    async def event_stream():
+        nonlocal last_id
+        idle_polls = 0
+        while not await http_request.is_disconnected():
+            events = job.events_since(last_id)
+            for event in events:
+                last_id = event["id"]
+                yield format_sse_event(event["event"], event["data"], event["id"])
+                if event["event"] in ("completed", "failed"):
+                    return
+
+            if events:
+                idle_polls = 0
+            else:
+                idle_polls += 1
+                # Comment line keeps proxies from closing an idle stream
+                if idle_polls % SSE_HEARTBEAT_POLLS == 0:
+                    yield ": keep-alive\n\n"
+            await asyncio.sleep(SSE_POLL_INTERVAL)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def format_sse_event(event: str, data, event_id: int = None) -> str:
+    message = ""
+    if event_id is not None:
+        message += f"id: {event_id}\n"
+    message += f"event: {event}\n"
+    message += f"data: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+    return message
+
+
+@router.get("/{job_id}")
+async def get_process_status(job_id: str):
+    """
+    Reports the stage, clips rendered so far and (once finished) the final result of a job.
+    """
+    job = job_manager.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+def run_process_pipeline(request: ProcessRequest, job: Job):
+    """
+    Full video processing pipeline (runs on a background worker):
     1. Download (if URL) or Use Local File.
     2. Extract Audio.
     3. Transcribe Audio (Whisper or Local).
     4. Analyze for best moments (Heuristic or LLM).
     5. Cut/Crop the best clips with Captions.
+    Rendered clips are published on the job as they finish; the final
+    response is stored in job.result.
     """
     
+    def run_transcription(audio_path):
+        with stage_timer("transcribe"):
+            return transcriber.transcribe_audio(
+                audio_path,
+                language=request.language,
+                progress_callback=lambda fraction: job.emit("transcription_progress", percent=round(fraction * 100))
+            )
+
+    def run_streaming_transcription(audio_path):
+        # Segments feed the scorer as they decode; each committed moment starts rendering at once
+        nonlocal segments
+        with stage_timer("transcribe"):
+            stream = transcriber.stream_transcription(audio_path, language=request.language)
+            segments = stream.segments
+            for segment in stream:
+                if stream.duration:
+                    job.emit("transcription_progress", percent=round(min(1.0, segment["end"] / stream.duration) * 100))
+                for moment in scorer.add_segment(segment):
+                    index = len(early_renders)
+                    log_debug(f"Moment committed during transcription: {moment['start']}-{moment['end']} (score {moment['score']})")
+                    job.emit("moment", index=index, **moment)
+                    future = render_executor.submit(render_clip, index, moment)
+                    future.add_done_callback(lambda f: f.result() and job.add_clip(f.result()))
+                    early_renders[index] = future
+            return stream.result()
+
+    # Set when transcription already started on the early audio track of a download
+    early_audio = None
+    early_transcript = None
+    # Streaming analysis (no LLM configured), set up once the audio is decoded
+    scorer = None
+    # Moment index -> render started during transcription
+    early_renders = {}
+    # Set if streaming transcription failed part way: segments only cover up to here
+    transcribed_until = None
+
+    def discard_early_audio():
+        # uploads/ is never evicted: the early track goes once transcription is done with it
+        if early_audio and early_transcript:
+            early_transcript.add_done_callback(lambda _: Path(early_audio).unlink(missing_ok=True))
+
     # Handle URL Input
     if request.video_url:
+        job.set_stage("downloading")
+        # Trimming changes the timeline, so only the untrimmed path can use the early audio
+        streaming = STREAMING_INGEST and request.processing_start_time is None and request.processing_end_time is None
         try:
             print(f"Downloading from URL: {request.video_url}")
-            request.video_path = downloader.download_video(request.video_url)
+            with stage_timer("download"):
+                if streaming:
+                    download = downloader.start_download(request.video_url)
+                    early_audio = download.wait_audio()
+                    if early_audio:
+                        # yt-dlp: the rest of the video is usually still downloading
+                        print(f"Early audio ready ({early_audio}), starting transcription during download")
+                        job.emit("audio_ready")
+                        early_transcript = transcription_executor.submit(run_transcription, early_audio)
+                    request.video_path = download.wait_video()
+                else:
+                    request.video_path = downloader.download_video(request.video_url)
             request.file_id = Path(request.video_path).stem
         except Exception as e:
+             discard_early_audio()
              raise HTTPException(status_code=400, detail=f"Download failed: {str(e)}")
 
     if not request.video_path or not Path(request.video_path).exists():
@@ -57,11 +293,14 @@ async def process_video(request: ProcessRequest):
 
     log_debug(f"--- START PROCESSING {request.file_id} ---")
 
+    # Content identity of the source; every cached stage output hangs off it
+    source_id = artifact_store.source_hash(request.video_path)
+
     # 0. Pre-process: Trim source video if needed
     if request.processing_start_time is not None or request.processing_end_time is not None:
+        job.set_stage("trimming")
         try:
             log_debug(f"Trimming source video: {request.video_path} ({request.processing_start_time}-{request.processing_end_time})")
-            trimmed_path = video_processor.output_dir / f"{request.file_id}_trimmed.mp4"
             
             # Default to 0 start if only end provided is rare, but handle it
             start = request.processing_start_time if request.processing_start_time else 0.0
@@ -81,13 +320,23 @@ async def process_video(request: ProcessRequest):
             # I'll add `trim_video_source` to video_processor next.
             
             # Assuming it exists or I will add it.
-            request.video_path = video_processor.trim_source_video(
-                request.video_path, 
-                trimmed_path, 
-                start, 
-                request.processing_end_time
-            )
-            log_debug(f"Trimmed video saved to: {request.video_path}")
+            trim_key = artifact_store.key("trim", source_id, start=start, end=request.processing_end_time)
+            cached_trim = artifact_store.get_file(trim_key, ".mp4")
+            if cached_trim:
+                request.video_path = str(cached_trim)
+                log_debug(f"Reusing trimmed video: {request.video_path}")
+            else:
+                trimmed_path = artifact_store.temp_path(trim_key, ".mp4")
+                with stage_timer("trim"):
+                    video_processor.trim_source_video(
+                        request.video_path, 
+                        trimmed_path, 
+                        start, 
+                        request.processing_end_time
+                    )
+                request.video_path = str(artifact_store.put_file(trim_key, ".mp4", trimmed_path))
+                log_debug(f"Trimmed video saved to: {request.video_path}")
+            source_id = trim_key
             
         except Exception as e:
             log_debug(f"Trimming failed: {e}")
@@ -97,22 +346,207 @@ async def process_video(request: ProcessRequest):
             raise HTTPException(status_code=500, detail=f"Failed to trim video: {str(e)}")
 
 
-    # 1. Extract Audio
+    # Scene index decode overlaps audio decoding and transcription
+    scene_future = scene_indexer.submit(request.video_path, source_id) if SCENE_INDEX else None
+
+    def scene_motion():
+        # Per-second motion for the energy heuristic; it ranks on audio alone without an index
+        if not scene_future:
+            return None
+        try:
+            return scene_future.result().motion
+        except Exception:
+            return None
+
+    # Render helpers are set up before transcription: with streaming analysis,
+    # confident clips start rendering while the rest of the audio is transcribed.
+    segments = []
+    moments = []
+    # Built once the transcript is complete; shared by boundary snapping and every clip's SRT
+    transcript_index = None
+
+    # Style string is the same for every clip of the job
+    final_style = build_style_string(
+        request.caption_style,
+        request.custom_color,
+        request.custom_bg_color,
+        request.custom_size
+    )
+
+    def write_subtitles(i, moment):
+        # Generate SRT if we have segments (Even if we used Heuristic analysis!)
+        # Crucial Fix: Use segments for captions even if 'moments' came from 'detect_high_energy_moments'
+        if not segments:
+            return None
+        if transcribed_until is not None and moment["end"] > transcribed_until:
+            # Past the end of a partial transcript: no captions rather than missing ones
+            return None
+        srt_path = video_processor.output_dir / f"{request.file_id}_short_{i+1}.srt"
+        try:
+            log_debug(f"Generating SRT to {srt_path}")
+            video_processor.generate_word_level_srt(
+                segments,
+                str(srt_path),
+                start_offset=moment["start"],
+                end_time=moment["end"],
+                transcript_index=transcript_index
+            )
+            log_debug(f"SRT generated. Exists? {Path(srt_path).exists()}")
+            return str(srt_path)
+        except Exception as e:
+            print(f"SRT generation failed for clip {i}: {e}")
+            log_debug(f"SRT generation failed: {e}")
+            return None
+
+    def clip_info(i, moment, final_path):
+        return {
+            "path": str(final_path),
+            "url": f"/static/{Path(final_path).name}",
+            "reason": moment.get("reason", "AI Selected"),
+            "start": moment["start"],
+            "end": moment["end"],
+            "title": moment.get("title", f"Clip {i+1}"),
+            "description": moment.get("description", ""),
+            "hashtags": moment.get("hashtags", [])
+        }
+
+    def render_clip(i, moment):
+        output_path = video_processor.output_dir / f"{request.file_id}_short_{i+1}.mp4"
+        log_debug(f"Processing Clip {i}: {moment['start']}-{moment['end']}")
+        
+        try:
+            subtitle_arg = write_subtitles(i, moment)
+
+            # Cut and Resize to Vertical with Captions
+            log_debug(f"Cutting video (Subtitles: {subtitle_arg})")
+            with stage_timer("cut_video"):
+                final_path = video_processor.cut_video(
+                    video_path=request.video_path,
+                    start_time=moment["start"],
+                    end_time=moment["end"],
+                    output_path=str(output_path),
+                    subtitle_path=subtitle_arg,
+                    style_name=request.caption_style,
+                    force_style_string=final_style,
+                    progress_callback=lambda fraction: job.emit("render_progress", clip=i+1, percent=round(fraction * 100))
+                )
+            return clip_info(i, moment, final_path)
+            
+        except Exception as e:
+            print(f"Error processing clip {i}: {str(e)}")
+            log_debug(f"Error processing clip {i}: {e}")
+            return None
+
+    def render_group(_, indices):
+        # One ffmpeg decode for a group of nearby clips; falls back to
+        # per-clip renders so a bad batch does not lose every clip in it.
+        # FFmpeg's -progress only follows the first output of a batch, so clips report
+        # 0% when their group starts and 100% when it is done
+        try:
+            batch = []
+            for i in indices:
+                moment = moments[i]
+                log_debug(f"Processing Clip {i} (batched): {moment['start']}-{moment['end']}")
+                job.emit("render_progress", clip=i+1, percent=0)
+                batch.append({
+                    "start": moment["start"],
+                    "end": moment["end"],
+                    "output_path": str(video_processor.output_dir / f"{request.file_id}_short_{i+1}.mp4"),
+                    "subtitle_path": write_subtitles(i, moment)
+                })
+            with stage_timer("cut_video_batch"):
+                paths = video_processor.cut_videos_batch(
+                    request.video_path,
+                    batch,
+                    style_name=request.caption_style,
+                    force_style_string=final_style
+                )
+            clips = {i: clip_info(i, moments[i], path) for i, path in zip(indices, paths)}
+            for i in indices:
+                job.emit("render_progress", clip=i+1, percent=100)
+        except Exception as e:
+            print(f"Batch render failed for clips {indices}: {e}. Rendering them one by one.")
+            log_debug(f"Batch render failed for clips {indices}: {e}")
+            clips = {i: render_clip(i, moments[i]) for i in indices}
+        for clip in clips.values():
+            if clip:
+                job.add_clip(clip)
+        return clips
+
+    # 1. Extract Audio (decoded once to PCM, shared by transcription and analysis)
+    job.set_stage("extracting_audio")
     try:
-        audio_path = video_processor.extract_audio(request.video_path)
-        log_debug(f"Audio extracted: {audio_path}")
+        audio_key = artifact_store.key("audio_pcm", source_id)
+        cached_audio = artifact_store.get_file(audio_key, PCM_SUFFIX)
+        if cached_audio:
+            audio_path = str(cached_audio)
+            log_debug(f"Reusing decoded audio: {audio_path}")
+        elif early_audio and is_pcm(early_audio):
+            # Already decoded by the audio tap during the download. Linked (not copied)
+            # into the store, so it is size-capped there and the uploads/ name can go.
+            tmp_audio = artifact_store.temp_path(audio_key, PCM_SUFFIX)
+            try:
+                os.link(early_audio, tmp_audio)
+            except OSError:
+                shutil.copyfile(early_audio, tmp_audio)
+            audio_path = str(artifact_store.put_file(audio_key, PCM_SUFFIX, tmp_audio))
+            log_debug(f"Using early audio from download: {audio_path}")
+        else:
+            # An early audio-only download is far cheaper to decode than the full video
+            tmp_audio = artifact_store.temp_path(audio_key, PCM_SUFFIX)
+            with stage_timer("extract_audio"):
+                video_processor.decode_audio(early_audio or request.video_path, str(tmp_audio))
+            audio_path = str(artifact_store.put_file(audio_key, PCM_SUFFIX, tmp_audio))
+            log_debug(f"Audio decoded: {audio_path}")
     except Exception as e:
         log_debug(f"Audio extraction failed: {e}")
         print(f"Audio extraction failed: {e}")
         raise HTTPException(status_code=500, detail="Audio extraction failed")
+    finally:
+        discard_early_audio()
+
 
+    if STREAMING_ANALYSIS and not analyzer.model:
+        energy = None
+        try:
+            energy = energy_envelope(load_pcm(audio_path))
+        except Exception as e:
+            log_debug(f"Energy envelope failed: {e}")
+        scorer = IncrementalMomentScorer(
+            request.num_shorts, request.clip_duration,
+            early_score=STREAMING_EARLY_SCORE, energy=energy
+        )
 
     # 2. Transcribe
+    job.set_stage("transcribing")
     transcript = None
+    transcript_key = artifact_store.key(
+        "transcript", source_id,
+        language=request.language,
+        backend=transcriber.backend_name,
+        # Local Whisper output depends on the model and its precision
+        model=LOCAL_MODEL_SIZE,
+        compute_type=LOCAL_COMPUTE_TYPE
+    )
     try:
-        print(f"Starting transcription... (Language: {request.language})")
-        log_debug(f"Starting transcription for {audio_path} (Language: {request.language})")
-        transcript = transcriber.transcribe_audio(audio_path, language=request.language)
+        transcript = artifact_store.get_json(transcript_key)
+        if transcript:
+            log_debug(f"Reusing cached transcript {transcript_key}")
+        else:
+            if early_transcript:
+                log_debug(f"Waiting for transcription started during download ({audio_path})")
+                transcript = early_transcript.result()
+            elif scorer:
+                print(f"Starting streaming transcription... (Language: {request.language})")
+                log_debug(f"Starting streaming transcription for {audio_path} (Language: {request.language})")
+                transcript = run_streaming_transcription(audio_path)
+            else:
+                print(f"Starting transcription... (Language: {request.language})")
+                log_debug(f"Starting transcription for {audio_path} (Language: {request.language})")
+                transcript = run_transcription(audio_path)
+            # Only cache what the configured backend produced, not a one-off fallback
+            if transcript and transcript.get("backend") == transcriber.backend_name and transcript.get("text", "").strip():
+                artifact_store.put_json(transcript_key, transcript)
         
         if transcript:
              log_debug(f"Transcription result: {len(transcript.get('text', ''))} chars")
@@ -131,10 +565,12 @@ async def process_video(request: ProcessRequest):
         with open("error_log.txt", "a") as f:
             f.write(f"Transcription Error (Lang: {request.language}): {str(e)}\n")
         # Proceed with transcript = None
+        if segments:
+            transcribed_until = segments[-1]["end"]
+            log_debug(f"Streaming transcription stopped at {transcribed_until}s with {len(early_renders)} clips rendering")
 
     # 3. Analyze
-    moments = []
-    segments = []
+    job.set_stage("analyzing")
     
     # Use LLM analysis if transcript is available
     if transcript:
@@ -148,9 +584,57 @@ async def process_video(request: ProcessRequest):
             segments = getattr(transcript, "segments", [])
 
         print(f"Transcript length: {len(text)}. Analysis...")
-        log_debug(f"Analyzing {len(text)} chars with LLM...")
-        moments = analyzer.analyze_transcript(text, segments, duration=request.clip_duration)
-        log_debug(f"LLM returned {len(moments)} moments.")
+        if scorer:
+            # Cached or download-time transcripts were not streamed through the scorer yet
+            if not scorer.segments:
+                for segment in segments:
+                    scorer.add_segment(segment)
+            scorer.finish(segments[-1]["end"] if segments else None)
+            moments = list(scorer.committed)
+            log_debug(f"Transcript scoring picked {len(moments)} moments ({len(early_renders)} rendered early).")
+        else:
+            moments_key = artifact_store.key(
+                "moments", transcript_key, clip_duration=request.clip_duration,
+                num_clips=request.num_shorts, window=ANALYSIS_WINDOW_SECONDS, max_windows=MAX_ANALYSIS_WINDOWS
+            )
+            moments = artifact_store.get_json(moments_key)
+            if moments:
+                log_debug(f"Reusing {len(moments)} cached moments.")
+            else:
+                log_debug(f"Analyzing {len(text)} chars with LLM...")
+                # The energy heuristic starts if the LLM has not answered within
+                # ANALYSIS_HEDGE_SECONDS; the first non-empty result wins. Cancelling the
+                # awaiting task does not stop the analysis thread, so it is told to stop
+                # sending windows once the hedge is decided.
+                analysis_cancelled = threading.Event()
+                with stage_timer("analyze"):
+                    try:
+                        moments, source = ai_clients.run(ai_clients.hedge(
+                            asyncio.to_thread(
+                                analyzer.analyze_transcript, text, segments,
+                                duration=request.clip_duration, num_clips=request.num_shorts,
+                                cancelled=analysis_cancelled
+                            ),
+                            lambda cancelled: analyzer.detect_high_energy_moments(
+                                request.video_path,
+                                num_clips=request.num_shorts,
+                                clip_duration=request.clip_duration,
+                                audio_path=audio_path,
+                                motion=scene_motion()
+                            ),
+                            ANALYSIS_HEDGE_SECONDS,
+                            accept=bool
+                        ))
+                    finally:
+                        analysis_cancelled.set()
+                if source == "fallback":
+                    log_debug(f"Heuristic answered before the LLM: {len(moments or [])} moments.")
+                    if moments:
+                        HEURISTIC_FALLBACKS.inc()
+                else:
+                    log_debug(f"LLM returned {len(moments)} moments.")
+                    if moments:
+                        artifact_store.put_json(moments_key, moments)
     
     # Save transcript for regeneration
     if transcript:
@@ -164,15 +648,23 @@ async def process_video(request: ProcessRequest):
              print(f"Failed to save transcript: {e}")
 
     
+    # Clips already rendering when a streaming transcription failed keep their indices;
+    # the heuristic only fills the slots after them (backfill below)
+    if not moments and early_renders:
+        moments = [dict(scorer.committed[i]) for i in sorted(early_renders)]
+
     # Fallback if AI fails (empty list) -> use heuristic
     if not moments:
         log_debug("Using heuristic fallback.")
+        HEURISTIC_FALLBACKS.inc()
         print("AI analysis failed or returned no clips. Using heuristic fallback.")
         # Pass user preferences to fallback logic
         moments = analyzer.detect_high_energy_moments(
             request.video_path, 
             num_clips=request.num_shorts, 
-            clip_duration=request.clip_duration
+            clip_duration=request.clip_duration,
+            audio_path=audio_path,
+            motion=scene_motion()
         )
 
     # Apply limit or backfill based on user request
@@ -188,7 +680,9 @@ async def process_video(request: ProcessRequest):
         heuristic_moments = analyzer.detect_high_energy_moments(
             request.video_path, 
             num_clips=request.num_shorts * 2, # Ask for more to find non-overlapping
-            clip_duration=request.clip_duration
+            clip_duration=request.clip_duration,
+            audio_path=audio_path,
+            motion=scene_motion()
         )
         
         # Filter out overlaps
@@ -200,119 +694,90 @@ async def process_video(request: ProcessRequest):
             return False
             
         added_count = 0
-        for hm in heuristic_moments:
-            if added_count >= needed:
-                break
-            
-            if not is_overlapping(hm, moments):
-                hm["reason"] = "Heuristic Backfill"
-                moments.append(hm)
-                added_count += 1
+        # Starts 10s apart first; a short source may only fit the rest 1s apart
+        for threshold in (10, 1):
+            for hm in heuristic_moments:
+                if added_count >= needed:
+                    break
+
+                if not is_overlapping(hm, moments, threshold):
+                    hm["reason"] = "Heuristic Backfill"
+                    moments.append(hm)
+                    added_count += 1
                 
         # Sort by start time to keep logical order (optional, but nice)
-        moments.sort(key=lambda x: x["start"])
-
-    generated_clips = []
-    
-    # 4. Cut Clips
-    for i, moment in enumerate(moments):
-        output_path = video_processor.output_dir / f"{request.file_id}_short_{i+1}.mp4"
-        srt_path = video_processor.output_dir / f"{request.file_id}_short_{i+1}.srt"
-        
-        log_debug(f"Processing Clip {i}: {moment['start']}-{moment['end']}")
-        
+        # Early renders are tied to their moment index, so keep the order then
+        if not early_renders:
+            moments.sort(key=lambda x: x["start"])
+
+    # Snap clip edges onto sentence (else word) boundaries so cuts never land mid-word.
+    # Moments already rendering since transcription keep their edges.
+    if segments:
+        transcript_index = TranscriptIndex(segments)
+    if transcript_index:
+        for i, moment in enumerate(moments):
+            if i not in early_renders:
+                before = (moment["start"], moment["end"])
+                transcript_index.snap_moment(moment)
+                if before != (moment["start"], moment["end"]):
+                    log_debug(f"Clip {i}: {before[0]}-{before[1]} snapped to {moment['start']}-{moment['end']}")
+
+    if scene_future:
         try:
-            # Generate SRT if we have segments (Even if we used Heuristic analysis!)
-            # Crucial Fix: Use segments for captions even if 'moments' came from 'detect_high_energy_moments'
-            subtitle_arg = None
-            if segments:
-                try:
-                    log_debug(f"Generating SRT to {srt_path}")
-                    video_processor.generate_word_level_srt(   
-                        segments, 
-                        str(srt_path), 
-                        start_offset=moment["start"]
-                    )
-                    subtitle_arg = str(srt_path)
-                    log_debug(f"SRT generated. Exists? {Path(srt_path).exists()}")
-                except Exception as e:
-                    print(f"SRT generation failed for clip {i}: {e}")
-                    log_debug(f"SRT generation failed: {e}")
-
-            # Construct Style String if custom options are present
-            base_style = STYLE_MAP.get(request.caption_style, STYLE_MAP["Classic"])
-            final_style = base_style
-
-            if request.custom_color:
-                # Convert #RRGGBB to &HBBGGRR&
-                hex_color = request.custom_color.lstrip('#')
-                if len(hex_color) == 6:
-                    r = hex_color[0:2]
-                    g = hex_color[2:4]
-                    b = hex_color[4:6]
-                    ass_color = f"&H{b}{g}{r}&" 
-                    # Replace PrimaryColour
-                    final_style = re.sub(r"PrimaryColour=&H[0-9A-Fa-f]+&", f"PrimaryColour={ass_color}", final_style)
-
-            if request.custom_bg_color:
-                # If BG Color is provided, switch to Box style logic (simplified)
-                hex_bg = request.custom_bg_color.lstrip('#')
-                if len(hex_bg) == 6:
-                    r = hex_bg[0:2]
-                    g = hex_bg[2:4]
-                    b = hex_bg[4:6]
-                    ass_bg_color = f"&H{b}{g}{r}&"
-                    
-                    # Force BorderStyle=3
-                    final_style = re.sub(r"BorderStyle=\d+", "BorderStyle=3", final_style)
-                    final_style = re.sub(r"Shadow=\d+", "Shadow=0", final_style)
-                    final_style = re.sub(r"OutlineColour=&H[0-9A-Fa-f]+&", f"OutlineColour={ass_bg_color}", final_style)
-
-            if request.custom_size:
-                final_style = re.sub(r"Fontsize=\d+", f"Fontsize={request.custom_size}", final_style)
-
-            # Cut and Resize to Vertical with Captions
-            log_debug(f"Cutting video (Subtitles: {subtitle_arg})")
-            final_path = video_processor.cut_video(
-                video_path=request.video_path,
-                start_time=moment["start"],
-                end_time=moment["end"],
-                output_path=str(output_path),
-                subtitle_path=subtitle_arg,
-                style_name=request.caption_style,
-                force_style_string=final_style
-            )
-            
-            # Clean up SRT file
-            if subtitle_arg and Path(subtitle_arg).exists():
-                try:
-                    # os.remove(subtitle_arg) # Disabled for debugging
-                    pass
-                except:
-                    pass
-            
-            generated_clips.append({
-                "path": str(final_path),
-                "url": f"/static/{Path(final_path).name}",
-                "reason": moment.get("reason", "AI Selected"),
-                "start": moment["start"],
-                "end": moment["end"],
-                "title": moment.get("title", f"Clip {i+1}"),
-                "description": moment.get("description", ""),
-                "hashtags": moment.get("hashtags", [])
-            })
-            
+            with stage_timer("scene_index"):
+                scenes = scene_future.result()
+            for i, moment in enumerate(moments):
+                if i in early_renders:
+                    continue
+                cut = scenes.nearest_cut(moment["start"], max_distance=SCENE_SNAP_SECONDS)
+                # A shot change wins over a sentence edge, but not if it would cut into a word.
+                # Only the start moves: the end stays on its sentence boundary.
+                if transcript_index and cut is not None and transcript_index.inside_word(cut):
+                    cut = None
+                if cut is not None and cut != moment["start"] and cut < moment["end"]:
+                    log_debug(f"Clip {i}: start {moment['start']} -> scene cut {cut}")
+                    moment["start"] = cut
         except Exception as e:
-            print(f"Error processing clip {i}: {str(e)}")
-            log_debug(f"Error processing clip {i}: {e}")
-            pass
+            log_debug(f"Scene index unavailable: {e}")
+            print(f"Scene index unavailable: {e}")
 
-    return {
+    # 4. Cut Clips
+    job.set_stage("rendering")
+
+    # Moments already rendering since transcription are only waited for
+    remaining = [i for i in range(len(moments)) if i not in early_renders]
+    rendered_by_index = {}
+    if RENDER_MODE == "batch" and len(remaining) > 1:
+        # Clips close to each other share one decode (see VideoProcessor.cut_videos_batch);
+        # independent groups still run concurrently on the render pool.
+        groups = [
+            [i for i in group if i not in early_renders]
+            for group in group_close_clips(moments, max_gap=BATCH_MAX_GAP)
+        ]
+        for group_result in render_executor.map_ordered(render_group, [group for group in groups if group]):
+            rendered_by_index.update(group_result or {})
+    else:
+        # Clips render concurrently; results come back in moment order and a
+        # failed clip is simply left out, as before.
+        results = render_executor.map_ordered(
+            lambda _, i: render_clip(i, moments[i]),
+            remaining,
+            on_result=lambda _, clip: job.add_clip(clip)
+        )
+        rendered_by_index.update(zip(remaining, results))
+    for i, future in early_renders.items():
+        rendered_by_index[i] = future.result()
+    rendered = [rendered_by_index.get(i) for i in range(len(moments))]
+    generated_clips = [clip for clip in rendered if clip]
+
+    result = {
         "status": "completed",
         "original_file": request.file_id,
         "transcript": transcript if transcript else "No Transcript Available",
         "clips": generated_clips
     }
+    job.update(result=result)
+    return result
 
 
 class RegenerateRequest(BaseModel):
@@ -323,10 +788,24 @@ class RegenerateRequest(BaseModel):
     custom_color: str = None # Expected format: #RRGGBB
     custom_bg_color: str = None # Expected format: #RRGGBB
     custom_size: int = None
+    quality: str = "final" # "preview" renders a fast 540x960 proxy, see QUALITY_PROFILES
 
 @router.post("/regenerate")
 async def regenerate_video(request: RegenerateRequest):
-    print(f"Regenerating {request.file_id} [{request.start_time}-{request.end_time}] Style: {request.caption_style}")
+    # Rendering blocks for seconds; keep it off the event loop
+    return await asyncio.to_thread(render_regenerated, request, request.quality)
+
+@router.post("/finalize")
+async def finalize_video(request: RegenerateRequest):
+    """
+    Renders the look chosen from previews at full quality.
+    """
+    return await asyncio.to_thread(render_regenerated, request, "final")
+
+def render_regenerated(request: RegenerateRequest, quality: str):
+    if quality not in QUALITY_PROFILES:
+        raise HTTPException(status_code=400, detail=f"Unknown quality '{quality}'. Use one of: {', '.join(QUALITY_PROFILES)}")
+    print(f"Regenerating {request.file_id} [{request.start_time}-{request.end_time}] Style: {request.caption_style} Quality: {quality}")
     
     # 1. Load Transcript
     transcript_path = video_processor.output_dir / f"{request.file_id}_transcript.json"
@@ -336,64 +815,17 @@ async def regenerate_video(request: RegenerateRequest):
     with open(transcript_path, "r", encoding="utf-8") as f:
         segments = json.load(f)
     
-    # 2. Generate SRT
-    # Use a unique suffix for regen to avoid caching/overwriting issues?
-    # Or just use "regen" prefix?
-    import time
-    ts = int(time.time())
-    output_filename = f"{request.file_id}_regen_{ts}.mp4"
-    output_path = video_processor.output_dir / output_filename
-    srt_path = video_processor.output_dir / f"{request.file_id}_regen_{ts}.srt"
-    
-    try:
-        video_processor.generate_word_level_srt(segments, str(srt_path), start_offset=request.start_time)
-    except Exception as e:
-        print(f"Error generating SRT: {e}")
-        raise HTTPException(status_code=500, detail="SRT generation failed")
-
-    # 3. Construct Style String
-    base_style = STYLE_MAP.get(request.caption_style, STYLE_MAP["Classic"])
-    final_style = base_style
-
-    if request.custom_color:
-        # Convert #RRGGBB to &HBBGGRR&
-        # Strip #
-        hex_color = request.custom_color.lstrip('#')
-        if len(hex_color) == 6:
-            r = hex_color[0:2]
-            g = hex_color[2:4]
-            b = hex_color[4:6]
-            ass_color = f"&H{b}{g}{r}&" 
-            # Replace PrimaryColour
-            final_style = re.sub(r"PrimaryColour=&H[0-9A-Fa-f]+&", f"PrimaryColour={ass_color}", final_style)
-
-    if request.custom_bg_color:
-        # If BG Color is provided, we switch to Box style (BorderStyle=3)
-        # Convert #RRGGBB to &HBBGGRR&
-        hex_bg = request.custom_bg_color.lstrip('#')
-        if len(hex_bg) == 6:
-            r = hex_bg[0:2]
-            g = hex_bg[2:4]
-            b = hex_bg[4:6]
-            ass_bg_color = f"&H{b}{g}{r}&"
-            
-            # Force BorderStyle=3
-            final_style = re.sub(r"BorderStyle=\d+", "BorderStyle=3", final_style)
-            # Set Shadow=0 to avoid weird look with box
-            final_style = re.sub(r"Shadow=\d+", "Shadow=0", final_style)
-            # Use OutlineColour for Box Background color in ASS with BorderStyle=3
-            # Or use BackColour? FFmpeg usually maps OutlineColour to box color for BorderStyle=3
-            # Let's replace OutlineColour with our custom BG color
-            final_style = re.sub(r"OutlineColour=&H[0-9A-Fa-f]+&", f"OutlineColour={ass_bg_color}", final_style)
-
-    if request.custom_size:
-        # Replace Fontsize
-        final_style = re.sub(r"Fontsize=\d+", f"Fontsize={request.custom_size}", final_style)
+    # 2. Construct Style String
+    final_style = build_style_string(
+        request.caption_style,
+        request.custom_color,
+        request.custom_bg_color,
+        request.custom_size
+    )
 
     print(f"Final Style String: {final_style}")
 
-    # 4. Cut Video
-    # We need to find the original video path?
+    # 3. Find the source
     # We assume it is in uploads with {file_id}.mp4? Or we need to look it up.
     # The processed/ directory has clips, but we need source.
     # We can try to guess or search in uploads.
@@ -406,30 +838,69 @@ async def regenerate_video(request: RegenerateRequest):
         else:
             raise HTTPException(status_code=404, detail="Original video file not found")
 
+    # 4. Identical restyles map to the same output file: the name is derived from
+    # everything that affects the pixels (source, range, quality, style, transcript)
+    source_id = artifact_store.source_hash(str(video_path))
+    render_key = artifact_store.key(
+        "regen", source_id,
+        start=request.start_time, end=request.end_time, quality=quality,
+        style=final_style, transcript=transcript_path.stat().st_mtime_ns
+    )
+    kind = "preview" if quality == "preview" else "regen"
+    output_stem = f"{request.file_id}_{kind}_{render_key.rsplit('_', 1)[1][:16]}"
+    output_filename = f"{output_stem}.mp4"
+    output_path = video_processor.output_dir / output_filename
+    srt_path = video_processor.output_dir / f"{output_stem}.srt"
+
+    if artifact_store.enabled and output_path.exists():
+        print(f"Identical restyle, reusing {output_filename}")
+        return {
+            "status": "completed",
+            "url": f"/static/{output_filename}",
+            "path": str(output_path),
+            "quality": quality
+        }
+
     try:
-        final_path = video_processor.cut_video(
-            video_path=str(video_path),
-            start_time=request.start_time,
-            end_time=request.end_time,
-            output_path=str(output_path),
-            subtitle_path=str(srt_path),
-            style_name=request.caption_style, # Ignored if force_style_string is passed
-            force_style_string=final_style
-        )
-        
-        # Cleanup SRT
-        try:
-            # os.remove(str(srt_path))
-            pass
-        except:
-            pass
-            
+        video_processor.generate_word_level_srt(segments, str(srt_path), start_offset=request.start_time, end_time=request.end_time)
+    except Exception as e:
+        print(f"Error generating SRT: {e}")
+        raise HTTPException(status_code=500, detail="SRT generation failed")
+
+    scratch_output = video_processor.output_dir / f"{output_stem}.{uuid.uuid4().hex}.tmp.mp4"
+    try:
+        with stage_timer("regenerate" if quality == "final" else "regenerate_preview"):
+            # 5. Caption-free cropped clip, shared by every restyle of this range
+            mezzanine_key = artifact_store.key("mezzanine", source_id, start=request.start_time, end=request.end_time, quality=quality)
+            mezzanine_path = artifact_store.get_file(mezzanine_key, ".mp4")
+            if mezzanine_path:
+                print(f"Using cached mezzanine for [{request.start_time}-{request.end_time}]")
+            else:
+                scratch_path = artifact_store.temp_path(mezzanine_key, ".mp4")
+                video_processor.cut_mezzanine(str(video_path), request.start_time, request.end_time, str(scratch_path), quality=quality)
+                mezzanine_path = artifact_store.put_file(mezzanine_key, ".mp4", str(scratch_path))
+
+            # 6. Burn captions only, into a scratch file so a concurrent identical
+            # request never picks up a half-written output
+            video_processor.burn_subtitles(
+                str(mezzanine_path),
+                str(srt_path),
+                str(scratch_output),
+                style_name=request.caption_style, # Ignored if force_style_string is passed
+                force_style_string=final_style,
+                quality=quality
+            )
+            os.replace(scratch_output, output_path)
+
         return {
             "status": "completed",
             "url": f"/static/{output_filename}",
-            "path": str(final_path)
+            "path": str(output_path),
+            "quality": quality
         }
 
     except Exception as e:
         print(f"Regeneration failed: {e}")
+        if scratch_output.exists():
+            scratch_output.unlink()
         raise HTTPException(status_code=500, detail=f"Regeneration failed: {str(e)}")
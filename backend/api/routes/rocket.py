@@ -1,7 +1,11 @@
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from pathlib import Path
+from typing import List, Optional
 from services.analysis import analyzer
+from services.jobs import job_manager
+import asyncio
+import bisect
 import json
 
 router = APIRouter()
@@ -12,38 +16,124 @@ class RocketRequest(BaseModel):
     clip_reason: str = ""  # Why this clip is interesting
     video_context: str = ""  # Transcript or context from the video
 
+class RocketClip(BaseModel):
+    clip_path: str
+    clip_title: str = ""
+    clip_reason: str = ""
+    start: Optional[float] = None  # Clip range in the transcript's timeline
+    end: Optional[float] = None
+
+class RocketBatchRequest(BaseModel):
+    job_id: str = ""  # Take the clips of this processing job...
+    clips: List[RocketClip] = []  # ...or these
+    video_context: str = ""
+
+
+def file_id_from_clip_path(clip_path: str) -> str:
+    stem = Path(clip_path).stem
+    return stem.split('_short_')[0] if '_short_' in stem else stem
+
+
+def load_transcript_segments(file_id: str) -> list:
+    """
+    Segments saved by the processing job for this file_id ([] if there are none).
+    """
+    try:
+        transcript_path = Path("processed") / f"{file_id}_transcript.json"
+        if transcript_path.exists():
+            with open(transcript_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+    except Exception as e:
+        print(f"Could not load transcript: {e}")
+    return []
+
+
+def context_from_segments(segments: list) -> str:
+    # Extract text from segments
+    return " ".join([seg.get("text", "") for seg in segments[:50]])
+
+
 @router.post("/generate")
 async def generate_rocket_content(request: RocketRequest):
     """
     Generate viral captions, hashtags, and descriptions for a video clip.
     Uses AI to analyze the video context and create engaging social media content.
     """
-    
+
     # Try to load transcript if video_context not provided
     video_context = request.video_context
     if not video_context and request.clip_path:
         # Try to find transcript from file_id
-        try:
-            clip_path = Path(request.clip_path)
-            file_id = clip_path.stem.split('_short_')[0] if '_short_' in clip_path.stem else clip_path.stem
-            transcript_path = Path("processed") / f"{file_id}_transcript.json"
-            
-            if transcript_path.exists():
-                with open(transcript_path, "r", encoding="utf-8") as f:
-                    segments = json.load(f)
-                    # Extract text from segments
-                    video_context = " ".join([seg.get("text", "") for seg in segments[:50]])
-        except Exception as e:
-            print(f"Could not load transcript: {e}")
-    
-    # Generate viral content using AI
-    result = analyzer.generate_viral_content(
+        video_context = context_from_segments(load_transcript_segments(file_id_from_clip_path(request.clip_path)))
+
+    # Generate viral content using AI (blocking call; keep it off the event loop)
+    result = await asyncio.to_thread(
+        analyzer.generate_viral_content,
         video_context=video_context,
         clip_title=request.clip_title,
         clip_reason=request.clip_reason
     )
-    
+
     return {
         "success": True,
         "content": result
     }
+
+
+@router.post("/generate-batch")
+async def generate_rocket_content_batch(request: RocketBatchRequest):
+    """
+    Rocket content for every clip of a job in one go: the transcript is loaded once and
+    the clips share a few LLM calls (ROCKET_BATCH_SIZE clips each) instead of one
+    request and one call per clip. Each clip is described by its own transcript excerpt.
+    Results are in clip order.
+    """
+    clips = [clip.dict() for clip in request.clips]
+    if request.job_id and not clips:
+        job = job_manager.get(request.job_id)
+        if not job:
+            raise HTTPException(status_code=404, detail="Job not found")
+        job_clips = (job.get("result") or {}).get("clips") or job.get("clips") or []
+        clips = [
+            {
+                "clip_path": clip["path"],
+                "clip_title": clip.get("title", ""),
+                "clip_reason": clip.get("reason", ""),
+                "start": clip.get("start"),
+                "end": clip.get("end")
+            }
+            for clip in job_clips
+        ]
+    if not clips:
+        raise HTTPException(status_code=400, detail="No clips to generate content for")
+
+    # All clips of a job come from the same source video
+    segments = load_transcript_segments(file_id_from_clip_path(clips[0]["clip_path"]))
+    video_context = request.video_context or context_from_segments(segments)
+    segment_starts = [seg.get("start", 0.0) for seg in segments]
+
+    def excerpt(clip: dict) -> str:
+        if clip.get("start") is None or clip.get("end") is None or not segments:
+            return ""
+        # Segments are in time order: take those starting before the clip ends, back to
+        # the last one starting before the clip does (it may run into the clip)
+        first = max(0, bisect.bisect_right(segment_starts, clip["start"]) - 1)
+        last = bisect.bisect_left(segment_starts, clip["end"])
+        return " ".join(
+            seg.get("text", "").strip() for seg in segments[first:last]
+            if seg.get("end", 0.0) > clip["start"]
+        )
+
+    batch = [
+        {"title": clip["clip_title"], "reason": clip["clip_reason"], "excerpt": excerpt(clip)}
+        for clip in clips
+    ]
+    contents = await asyncio.to_thread(analyzer.generate_viral_content_batch, video_context, batch)
+
+    return {
+        "success": True,
+        "results": [
+            {"clip_path": clip["clip_path"], "content": content}
+            for clip, content in zip(clips, contents)
+        ]
+    }
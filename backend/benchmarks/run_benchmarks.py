@@ -0,0 +1,508 @@
+"""
+Offline benchmark suite for the processing pipeline.
+
+Generates synthetic sources with FFmpeg lavfi (testsrc2 video + sine/noise audio),
+drives the pipeline stages with fake STT and LLM providers, and writes a JSON report
+of latency and throughput per stage. Needs only FFmpeg on a CPU-only box; no network.
+
+Usage (from backend/):
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --durations 60,600 --resolutions 1280x720 --repeat 3 --output bench.json
+"""
+
+import argparse
+import copy
+import json
+import os
+import platform
+import random
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# Duration of the source currently being benchmarked, read by the STT stub
+STUB_STATE = {"duration": 60.0}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the Auto Shorts pipeline on synthetic media.")
+    parser.add_argument("--durations", default="30,120", help="Comma separated source durations in seconds.")
+    parser.add_argument("--resolutions", default="640x360,1920x1080", help="Comma separated WxH source resolutions.")
+    parser.add_argument("--audio", default="sine", choices=["sine", "noise"], help="Synthetic audio track.")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per stage (report keeps every run).")
+    parser.add_argument("--clip-duration", type=int, default=15, help="Clip length used for cutting and the full pipeline.")
+    parser.add_argument("--num-shorts", type=int, default=2, help="Clips rendered by the full pipeline run.")
+    parser.add_argument("--stt-latency", type=float, default=0.0, help="Simulated STT API response time (seconds).")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Simulated LLM response time per call (seconds).")
+    parser.add_argument("--stages", default="", help="Comma separated subset of stages to run (default: all).")
+    parser.add_argument("--workdir", default=None, help="Where sources and outputs go (default: a temp dir).")
+    parser.add_argument("--output", default="bench_report.json", help="Path of the JSON report.")
+    return parser.parse_args()
+
+
+def generate_source(ffmpeg_path: str, path: Path, duration: int, resolution: str, audio: str):
+    """
+    Writes a synthetic H.264/AAC source: moving test pattern plus a tone or pink noise.
+    """
+    width, height = resolution.split("x")
+    if audio == "noise":
+        audio_src = f"anoisesrc=color=pink:amplitude=0.3:duration={duration}"
+    else:
+        audio_src = f"sine=frequency=440:beep_factor=4:duration={duration}"
+    command = [
+        ffmpeg_path, "-y", "-hide_banner", "-loglevel", "error",
+        "-f", "lavfi", "-i", f"testsrc2=size={width}x{height}:rate=30:duration={duration}",
+        "-f", "lavfi", "-i", audio_src,
+        "-c:v", "libx264", "-preset", "ultrafast", "-g", "60",
+        "-c:a", "aac", "-shortest",
+        str(path)
+    ]
+    subprocess.run(command, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+
+def synthetic_transcript(duration: float, words_per_second: float = 2.5, segment_length: float = 5.0) -> dict:
+    """
+    Whisper-shaped transcript ({text, segments:[{start, end, text, words}]}) covering the whole source.
+    """
+    segments = []
+    word_step = 1.0 / words_per_second
+    start = 0.0
+    index = 0
+    while start < duration:
+        end = min(duration, start + segment_length)
+        words = []
+        t = start
+        while t < end:
+            words.append({"word": f" word{index}", "start": round(t, 3), "end": round(min(end, t + word_step * 0.8), 3)})
+            index += 1
+            t += word_step
+        segments.append({
+            "start": start,
+            "end": end,
+            "text": "".join(w["word"] for w in words).strip(),
+            "words": words
+        })
+        start = end
+    return {
+        "text": " ".join(seg["text"] for seg in segments),
+        "segments": segments,
+        "backend": "stub"
+    }
+
+
+def synthetic_telugu_transcript(duration: float) -> dict:
+    """
+    synthetic_transcript with Telugu words: common words plus random syllable words,
+    drawn with a skewed distribution so words repeat as they do in speech.
+    """
+    from services.transliteration import COMMON_WORDS, CONSONANTS, VOWEL_MARKS
+    rng = random.Random(0)
+    consonants = [c for c in CONSONANTS if c not in ("ం", "ః", "ఁ")]
+    marks = list(VOWEL_MARKS)
+    vocabulary = list(COMMON_WORDS) + [
+        "".join(rng.choice(consonants) + rng.choice(marks + [""]) for _ in range(rng.randint(2, 4)))
+        for _ in range(2000)
+    ]
+    weights = [1.0 / (rank + 1) for rank in range(len(vocabulary))]
+
+    transcript = synthetic_transcript(duration)
+    for segment in transcript["segments"]:
+        for word in segment["words"]:
+            word["word"] = " " + rng.choices(vocabulary, weights)[0]
+        segment["text"] = "".join(w["word"] for w in segment["words"]).strip()
+    transcript["text"] = " ".join(seg["text"] for seg in transcript["segments"])
+    return transcript
+
+
+def legacy_transliterate(text: str) -> str:
+    """
+    The per-character Telugu romanizer the compiled engine replaced, kept as the baseline.
+    """
+    from services.transliteration import COMMON_WORDS, CONSONANTS, VOWEL_MARKS, VOWELS
+    if not text:
+        return ""
+    if not any('\u0C00' <= char <= '\u0C7F' for char in text):
+        return text
+    result = []
+    for word in text.split():
+        if word in COMMON_WORDS:
+            result.append(COMMON_WORDS[word])
+            continue
+        word_clean = word.rstrip('?!.,')
+        if word_clean in COMMON_WORDS:
+            result.append(COMMON_WORDS[word_clean])
+            continue
+        roman_word = ""
+        i = 0
+        while i < len(word):
+            char = word[i]
+            if '\u0C00' <= char <= '\u0C7F':
+                if char in VOWELS:
+                    roman_word += VOWELS[char]
+                elif char in CONSONANTS:
+                    base = CONSONANTS[char]
+                    if i + 1 < len(word) and word[i + 1] in VOWEL_MARKS:
+                        mark = VOWEL_MARKS[word[i + 1]]
+                        roman_word += base[:-1] + mark if mark else base[:-1]
+                        i += 1
+                    else:
+                        roman_word += base
+                elif char in VOWEL_MARKS:
+                    roman_word += VOWEL_MARKS[char]
+                else:
+                    roman_word += char
+            else:
+                roman_word += char
+            i += 1
+        result.append(roman_word)
+    return ' '.join(result)
+
+
+def legacy_roman_transcript(result: dict) -> dict:
+    # Full text, then every segment, then every word, each from scratch
+    result["text"] = legacy_transliterate(result["text"])
+    for segment in result["segments"]:
+        segment["text"] = legacy_transliterate(segment["text"])
+        for word in segment["words"]:
+            word["word"] = legacy_transliterate(word["word"])
+    return result
+
+
+def stub_moments(duration: float, clip_duration: int, count: int) -> list:
+    """
+    Evenly spread LLM-shaped moments, standing in for Gemini.
+    """
+    usable = max(0.0, duration - clip_duration)
+    moments = []
+    for i in range(count):
+        start = usable * (i + 1) / (count + 1)
+        moments.append({
+            "start": round(start, 3),
+            "end": round(min(duration, start + clip_duration), 3),
+            "reason": "Benchmark stub",
+            "score": 0.9,
+            "title": f"Bench clip {i + 1}"
+        })
+    return moments
+
+
+def measure(fn, repeat: int) -> dict:
+    """
+    Runs fn `repeat` times and summarises wall-clock latency.
+    """
+    runs = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - started)
+    return {
+        "runs_s": [round(r, 4) for r in runs],
+        "mean_s": round(statistics.mean(runs), 4),
+        "median_s": round(statistics.median(runs), 4),
+        "min_s": round(min(runs), 4),
+        "max_s": round(max(runs), 4),
+    }
+
+
+def with_throughput(result: dict, media_seconds: float = None, items: int = None) -> dict:
+    """
+    Adds realtime factor (media seconds per wall second) and/or items per second.
+    """
+    best = result["min_s"] or 1e-9
+    if media_seconds is not None:
+        result["media_seconds"] = media_seconds
+        result["realtime_factor"] = round(media_seconds / best, 2)
+    if items is not None:
+        result["items"] = items
+        result["items_per_s"] = round(items / best, 2)
+    return result
+
+
+def run_case(services, source: Path, duration: int, args, selected) -> dict:
+    video_processor = services["video_processor"]
+    process = services["process"]
+    Job = services["Job"]
+    out_dir = video_processor.output_dir
+    STUB_STATE["duration"] = duration
+    transcript = synthetic_transcript(duration)
+    segments = transcript["segments"]
+    clip_duration = min(args.clip_duration, duration)
+    clip_start = max(0.0, (duration - clip_duration) / 2)
+    stages = {}
+
+    if "extract_audio" in selected:
+        stages["extract_audio"] = with_throughput(
+            measure(lambda: video_processor.extract_audio(str(source), str(out_dir / f"{source.stem}.mp3")), args.repeat),
+            media_seconds=duration
+        )
+
+    if "decode_audio" in selected:
+        stages["decode_audio"] = with_throughput(
+            measure(lambda: video_processor.decode_audio(str(source), str(out_dir / f"{source.stem}.f32")), args.repeat),
+            media_seconds=duration
+        )
+
+    if "detect_high_energy_moments" in selected:
+        pcm_path = out_dir / f"{source.stem}.f32"
+        if not pcm_path.exists():
+            video_processor.decode_audio(str(source), str(pcm_path))
+        stages["detect_high_energy_moments"] = with_throughput(
+            measure(lambda: services["analyzer"].detect_high_energy_moments(
+                str(source), num_clips=args.num_shorts, clip_duration=clip_duration, audio_path=str(pcm_path)
+            ), args.repeat),
+            media_seconds=duration
+        )
+        # More clips than fit side by side: the heuristic must still return every one
+        if clip_duration < duration:
+            crowded = int(duration // clip_duration) + 2
+            crowded_moments = services["analyzer"].detect_high_energy_moments(
+                str(source), num_clips=crowded, clip_duration=clip_duration, audio_path=str(pcm_path)
+            )
+            stages["detect_high_energy_moments"]["crowded_requested"] = crowded
+            stages["detect_high_energy_moments"]["crowded_moments"] = len(crowded_moments)
+            if len(crowded_moments) != crowded:
+                print(f"   Warning: heuristic returned {len(crowded_moments)}/{crowded} moments")
+
+    if "scene_index" in selected:
+        from services.scenes import scene_indexer
+        stages["scene_index"] = with_throughput(
+            measure(lambda: scene_indexer.build(str(source)), args.repeat),
+            media_seconds=duration
+        )
+
+    if "generate_word_level_srt" in selected:
+        # One clip's SRT from the job-wide word index, as the pipeline does it
+        from services.transcript_index import TranscriptIndex
+        transcript_index = TranscriptIndex(segments)
+        word_count = len(transcript_index.words_between(clip_start, clip_start + clip_duration))
+        stages["generate_word_level_srt"] = with_throughput(
+            measure(lambda: video_processor.generate_word_level_srt(
+                segments, str(out_dir / f"{source.stem}_bench.srt"), start_offset=clip_start,
+                end_time=clip_start + clip_duration, transcript_index=transcript_index
+            ), args.repeat),
+            items=word_count
+        )
+        stages["generate_word_level_srt"]["srt_bytes"] = (out_dir / f"{source.stem}_bench.srt").stat().st_size
+
+    if "trim_source_video" in selected:
+        trim_start, trim_end = duration * 0.25, duration * 0.75
+        stages["trim_source_video"] = with_throughput(
+            measure(lambda: video_processor.trim_source_video(
+                str(source), str(out_dir / f"{source.stem}_trimmed.mp4"), trim_start, trim_end
+            ), args.repeat),
+            media_seconds=trim_end - trim_start
+        )
+        # The output path is relative to the workdir, as in the app; smart trim must not
+        # fall back to a full re-encode because of it
+        try:
+            smart_trim = video_processor._smart_trim(
+                source, Path(out_dir) / f"{source.stem}_smart_trimmed.mp4", trim_start, trim_end
+            )
+        except Exception as e:
+            print(f"   Warning: smart trim failed: {e}")
+            smart_trim = False
+        stages["trim_source_video"]["smart_trim"] = smart_trim
+
+    if "cut_video" in selected:
+        srt_path = out_dir / f"{source.stem}_cut.srt"
+        video_processor.generate_word_level_srt(segments, str(srt_path), start_offset=clip_start, end_time=clip_start + clip_duration)
+        stages["cut_video"] = with_throughput(
+            measure(lambda: video_processor.cut_video(
+                str(source), clip_start, clip_start + clip_duration,
+                output_path=str(out_dir / f"{source.stem}_cut.mp4"),
+                subtitle_path=str(srt_path)
+            ), args.repeat),
+            media_seconds=clip_duration
+        )
+
+    if "cut_videos_batch" in selected:
+        # Two overlapping clips from one decode; each must have as many frames as cut_video gives it
+        batch_clips = [
+            {"start": clip_start, "end": clip_start + clip_duration, "output_path": str(out_dir / f"{source.stem}_batch1.mp4")},
+            {"start": clip_start / 2, "end": clip_start / 2 + clip_duration, "output_path": str(out_dir / f"{source.stem}_batch2.mp4")},
+        ]
+        stages["cut_videos_batch"] = with_throughput(
+            measure(lambda: video_processor.cut_videos_batch(str(source), batch_clips), args.repeat),
+            media_seconds=clip_duration * len(batch_clips)
+        )
+        reference = out_dir / f"{source.stem}_batch_reference.mp4"
+        video_processor.cut_video(str(source), clip_start, clip_start + clip_duration, output_path=str(reference))
+        reference_frames = count_frames(video_processor.ffmpeg_path, reference)
+        batch_frames = [count_frames(video_processor.ffmpeg_path, Path(clip["output_path"])) for clip in batch_clips]
+        stages["cut_videos_batch"]["frames"] = batch_frames
+        stages["cut_videos_batch"]["cut_video_frames"] = reference_frames
+        stages["cut_videos_batch"]["frames_match_cut_video"] = all(frames == reference_frames for frames in batch_frames)
+        if not stages["cut_videos_batch"]["frames_match_cut_video"]:
+            print(f"   Warning: cut_videos_batch rendered {batch_frames} frames, cut_video {reference_frames}")
+
+    if "transliterate_transcript" in selected:
+        # Roman Telugu captions: the legacy per-character path vs the compiled engine (cold word cache)
+        from services.transliteration import telugu_transliterator
+        telugu = synthetic_telugu_transcript(duration)
+        word_count = sum(len(seg["words"]) for seg in telugu["segments"])
+        legacy_inputs = iter([copy.deepcopy(telugu) for _ in range(args.repeat)])
+        compiled_inputs = iter([copy.deepcopy(telugu) for _ in range(args.repeat)])
+
+        def run_compiled():
+            telugu_transliterator.word.cache_clear()
+            telugu_transliterator.transliterate_transcript(next(compiled_inputs))
+
+        legacy = with_throughput(measure(lambda: legacy_roman_transcript(next(legacy_inputs)), args.repeat), items=word_count)
+        stages["transliterate_transcript"] = with_throughput(measure(run_compiled, args.repeat), items=word_count)
+        stages["transliterate_transcript"]["legacy"] = legacy
+        stages["transliterate_transcript"]["speedup"] = round(legacy["min_s"] / (stages["transliterate_transcript"]["min_s"] or 1e-9), 2)
+        stages["transliterate_transcript"]["matches_legacy"] = (
+            legacy_roman_transcript(copy.deepcopy(telugu)) == telugu_transliterator.transliterate_transcript(copy.deepcopy(telugu))
+        )
+
+    if "process_video" in selected:
+        def run_pipeline():
+            request = process.ProcessRequest(
+                file_id=f"{source.stem}_bench",
+                video_path=str(source),
+                num_shorts=args.num_shorts,
+                clip_duration=clip_duration,
+            )
+            result = process.run_process_pipeline(request, Job("benchmark"))
+            if len(result["clips"]) != args.num_shorts:
+                print(f"   Warning: pipeline rendered {len(result['clips'])}/{args.num_shorts} clips")
+
+        from services.ai_clients import ai_clients
+        llm_calls, stt_calls = ai_clients.llm.calls, ai_clients.stt.calls
+        stages["process_video"] = with_throughput(
+            measure(run_pipeline, args.repeat),
+            media_seconds=duration
+        )
+        # Zero here means the pipeline skipped the provider path being benchmarked
+        stages["process_video"]["llm_calls"] = ai_clients.llm.calls - llm_calls
+        stages["process_video"]["stt_calls"] = ai_clients.stt.calls - stt_calls
+
+    return stages
+
+
+def stub_llm_response(prompt: str) -> str:
+    """
+    Answers a moment-analysis prompt the way Gemini would: clips spread evenly over
+    the window's transcript segments, as JSON.
+    """
+    starts = [float(value) for value in re.findall(r'"start": ([\d.]+)', prompt)]
+    ends = [float(value) for value in re.findall(r'"end": ([\d.]+)', prompt)]
+    if not starts:
+        return "[]"
+    clip_duration = int(re.search(r"under (\d+) seconds", prompt).group(1))
+    count = int(re.search(r"at most (\d+) clips", prompt).group(1))
+    moments = stub_moments(ends[-1] - starts[0], clip_duration, count)
+    for moment in moments:
+        moment["start"] = round(moment["start"] + starts[0], 3)
+        moment["end"] = round(moment["end"] + starts[0], 3)
+    return json.dumps(moments)
+
+
+def install_stubs(args):
+    """
+    Puts deterministic offline fake providers behind the STT and LLM clients, so the
+    pipeline takes its API code paths (upload encode, windowed LLM analysis) with no
+    network. --stt-latency / --llm-latency simulate provider response times.
+    """
+    from services.ai_clients import ai_clients, FakeLLMProvider, FakeSTTProvider
+    ai_clients.stt = FakeSTTProvider(lambda audio_path: synthetic_transcript(STUB_STATE["duration"]), latency=args.stt_latency)
+    ai_clients.llm = FakeLLMProvider(stub_llm_response, latency=args.llm_latency, model_name="benchmark-stub")
+
+
+def count_frames(ffmpeg_path: str, path: Path) -> int:
+    """
+    Decoded video frames of a file (the last frame= of a null decode).
+    """
+    result = subprocess.run(
+        [ffmpeg_path, "-hide_banner", "-i", str(path), "-map", "0:v:0", "-f", "null", "-"],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, errors="replace"
+    )
+    matches = re.findall(r"frame=\s*(\d+)", result.stderr)
+    return int(matches[-1]) if matches else 0
+
+
+def ffmpeg_version(ffmpeg_path: str) -> str:
+    try:
+        result = subprocess.run([ffmpeg_path, "-version"], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        return result.stdout.splitlines()[0] if result.stdout else "unknown"
+    except Exception:
+        return "unknown"
+
+
+def main():
+    args = parse_args()
+    output_path = Path(args.output).absolute()
+    workdir = Path(args.workdir or tempfile.mkdtemp(prefix="autoshorts_bench_")).absolute()
+    workdir.mkdir(parents=True, exist_ok=True)
+
+    # Services create uploads/ and processed/ relative to the CWD and read config at import time:
+    # run inside the workdir and keep the artifact cache from short-circuiting repeated runs.
+    os.environ.setdefault("ARTIFACT_CACHE", "0")
+    os.environ.setdefault("LLM_CACHE", "0")
+    # Fake providers only; the empty keys also stop load_dotenv() from filling them in from .env
+    os.environ["LLM_PROVIDER"] = "fake"
+    os.environ["STT_PROVIDER"] = "fake"
+    os.environ["OPENAI_API_KEY"] = ""
+    os.environ["GEMINI_API_KEY"] = ""
+    os.chdir(workdir)
+    sys.path.insert(0, str(BACKEND_DIR))
+
+    from services.video_processing import video_processor
+    from services.analysis import analyzer
+    from services.jobs import Job
+    from api.routes import process
+
+    services = {
+        "video_processor": video_processor,
+        "analyzer": analyzer,
+        "process": process,
+        "Job": Job,
+    }
+    install_stubs(args)
+
+    all_stages = ["extract_audio", "decode_audio", "detect_high_energy_moments", "scene_index", "generate_word_level_srt", "trim_source_video", "cut_video", "cut_videos_batch", "transliterate_transcript", "process_video"]
+    selected = [s for s in args.stages.split(",") if s] or all_stages
+
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "ffmpeg": ffmpeg_version(video_processor.ffmpeg_path),
+        },
+        "config": vars(args),
+        "cases": [],
+    }
+
+    sources_dir = workdir / "sources"
+    sources_dir.mkdir(exist_ok=True)
+    for duration in [int(d) for d in args.durations.split(",") if d]:
+        for resolution in [r for r in args.resolutions.split(",") if r]:
+            source = sources_dir / f"synthetic_{duration}s_{resolution}_{args.audio}.mp4"
+            if not source.exists():
+                print(f"Generating {source.name}...")
+                generate_source(video_processor.ffmpeg_path, source, duration, resolution, args.audio)
+
+            print(f"Benchmarking {source.name} ({', '.join(selected)})...")
+            stages = run_case(services, source, duration, args, selected)
+            for name, result in stages.items():
+                print(f"   {name}: min {result['min_s']}s, mean {result['mean_s']}s")
+            report["cases"].append({
+                "source": {"duration_s": duration, "resolution": resolution, "audio": args.audio},
+                "stages": stages,
+            })
+
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {output_path}")
+
+
+if __name__ == "__main__":
+    main()
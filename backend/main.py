@@ -1,15 +1,30 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
+from fastapi.responses import PlainTextResponse, JSONResponse
 from api.routes import upload, process
+from services.metrics import registry, monitor_event_loop_lag
+from services.transcription import transcriber, WHISPER_PRELOAD
 
 app = FastAPI(title="Auto Shorts Maker API", version="1.0.0")
 
+import asyncio
 import socket
 import subprocess
 
 @app.on_event("startup")
 async def startup_event():
+    # Event loop lag shows up on /metrics; blocking calls inside async handlers inflate it
+    asyncio.create_task(monitor_event_loop_lag())
+
+    if WHISPER_PRELOAD:
+        # Load models in the background; /ready reports 503 until they are warm
+        loop = asyncio.get_running_loop()
+        preload = loop.run_in_executor(None, transcriber.preload_models)
+        preload.add_done_callback(
+            lambda f: f.exception() and print(f"Whisper preload failed: {f.exception()}")
+        )
+
     print("--- STARTUP NETWORK DIAGNOSTICS ---")
     try:
         # Test 1: DNS Resolution (System)
@@ -82,3 +97,20 @@ app.mount("/static", StaticFiles(directory="processed"), name="static")
 @app.get("/")
 def read_root():
     return {"message": "Auto Shorts Maker API is running"}
+
+@app.get("/ready")
+def ready():
+    """
+    Readiness probe: 503 while the startup preload (WHISPER_PRELOAD=1) of the local
+    Whisper model is still running; otherwise ready.
+    """
+    is_ready = transcriber.is_ready
+    return JSONResponse({"ready": is_ready}, status_code=200 if is_ready else 503)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """
+    Prometheus scrape endpoint: per-stage durations, job queue depth, in-flight FFmpeg
+    processes, STT backend usage, LLM failures/heuristic fallbacks and event loop lag.
+    """
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
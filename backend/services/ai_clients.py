@@ -0,0 +1,234 @@
+"""
+Async client layer for the external AI providers: Gemini (moment analysis, Rocket
+content) and the OpenAI Whisper API (speech-to-text).
+Every call gets a deadline and a slot under a per-provider concurrency limit, and
+hedge() starts the local fallback (faster-whisper, the energy heuristic) once a
+provider has used up its latency budget instead of waiting for it to fail.
+Calls run on one background event loop, so the synchronous pipeline threads and
+the FastAPI handlers share the same limits. Providers are pluggable: set
+LLM_PROVIDER=fake / STT_PROVIDER=fake (or assign ai_clients.llm / ai_clients.stt)
+to run everything offline.
+"""
+
+import asyncio
+import json
+import os
+import threading
+import openai
+import google.generativeai as genai
+from dotenv import load_dotenv
+
+load_dotenv()
+
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "gemini")  # gemini | fake
+STT_PROVIDER = os.getenv("STT_PROVIDER", "openai")  # openai | fake
+# Per-call deadlines (seconds), including time spent waiting for a concurrency slot
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "60"))
+STT_TIMEOUT_SECONDS = float(os.getenv("STT_TIMEOUT_SECONDS", "600"))
+# Calls in flight per provider, across all jobs in this process
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+STT_MAX_CONCURRENCY = int(os.getenv("STT_MAX_CONCURRENCY", "4"))
+# Latency budgets after which the local fallback starts alongside the provider
+# (0: only fall back after a failure)
+STT_HEDGE_SECONDS = float(os.getenv("STT_HEDGE_SECONDS", "120"))
+ANALYSIS_HEDGE_SECONDS = float(os.getenv("ANALYSIS_HEDGE_SECONDS", "30"))
+
+
+class GeminiProvider:
+    name = "gemini"
+
+    def __init__(self, model_name: str = "gemini-1.5-flash", api_key: str = None):
+        self.model_name = model_name
+        self.api_key = api_key or os.getenv("GEMINI_API_KEY")
+        self.model = None
+        if self.api_key:
+            genai.configure(api_key=self.api_key)
+            self.model = genai.GenerativeModel(model_name)
+
+    @property
+    def available(self) -> bool:
+        return self.model is not None
+
+    async def generate(self, prompt: str, generation_config: dict = None) -> str:
+        response = await self.model.generate_content_async(prompt, generation_config=generation_config)
+        return response.text
+
+
+class OpenAISTTProvider:
+    name = "openai"
+
+    def __init__(self, api_key: str = None):
+        self.api_key = api_key or os.getenv("OPENAI_API_KEY")
+        self.client = openai.AsyncOpenAI(api_key=self.api_key) if self.api_key else None
+
+    @property
+    def available(self) -> bool:
+        return self.client is not None
+
+    async def transcribe(self, audio_path: str, language: str = None) -> dict:
+        """
+        whisper-1 with segment and word timestamps, as a plain dict (OpenAI verbose_json).
+        """
+        kwargs = {
+            "model": "whisper-1",
+            "response_format": "verbose_json",
+            "timestamp_granularities": ["segment", "word"]
+        }
+        # Only add language if provided, otherwise auto-detect
+        if language:
+            kwargs["language"] = language
+        with open(audio_path, "rb") as audio_file:
+            transcript = await self.client.audio.transcriptions.create(file=audio_file, **kwargs)
+        return transcript.model_dump() if hasattr(transcript, "model_dump") else dict(transcript)
+
+
+class FakeLLMProvider:
+    """
+    Offline stand-in for Gemini. response is the text to return, or a function of
+    the prompt; latency and error simulate a slow or failing provider.
+    """
+    name = "fake"
+    available = True
+
+    def __init__(self, response="[]", latency: float = 0.0, error: Exception = None, model_name: str = "fake-llm"):
+        self.response = response
+        self.latency = latency
+        self.error = error
+        self.model_name = model_name
+        self.calls = 0
+
+    async def generate(self, prompt: str, generation_config: dict = None) -> str:
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        if self.error:
+            raise self.error
+        return self.response(prompt) if callable(self.response) else self.response
+
+
+class FakeSTTProvider:
+    """
+    Offline stand-in for the OpenAI Whisper API. result is the verbose_json dict to
+    return, or a function of the audio path.
+    """
+    name = "fake"
+    available = True
+
+    def __init__(self, result=None, latency: float = 0.0, error: Exception = None):
+        self.result = result or {"text": "", "segments": [], "language": "en", "duration": 0.0}
+        self.latency = latency
+        self.error = error
+        self.calls = 0
+
+    async def transcribe(self, audio_path: str, language: str = None) -> dict:
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        if self.error:
+            raise self.error
+        result = self.result(audio_path) if callable(self.result) else self.result
+        return json.loads(json.dumps(result))
+
+
+class AIClients:
+    def __init__(self, llm=None, stt=None):
+        self.llm = llm or (FakeLLMProvider() if LLM_PROVIDER == "fake" else GeminiProvider())
+        self.stt = stt or (FakeSTTProvider() if STT_PROVIDER == "fake" else OpenAISTTProvider())
+        self._loop = None
+        self._loop_thread = None
+        self._loop_lock = threading.Lock()
+        self._limits = {}
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._loop_thread = threading.Thread(target=self._loop.run_forever, name="ai-clients", daemon=True)
+                self._loop_thread.start()
+            return self._loop
+
+    def run(self, coro):
+        """
+        Runs a coroutine on the client loop and blocks the calling (worker) thread for its result.
+        """
+        loop = self._get_loop()
+        if threading.current_thread() is self._loop_thread:
+            coro.close()
+            raise RuntimeError("AIClients.run() called from the client loop; await the coroutine instead")
+        return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+    def _limit(self, kind: str, size: int) -> asyncio.Semaphore:
+        # Created lazily on the client loop, which owns them
+        if kind not in self._limits:
+            self._limits[kind] = asyncio.Semaphore(max(1, size))
+        return self._limits[kind]
+
+    async def _call(self, kind: str, size: int, deadline: float, make_call):
+        async def limited():
+            async with self._limit(kind, size):
+                return await make_call()
+        return await asyncio.wait_for(limited(), timeout=deadline)
+
+    async def generate(self, prompt: str, generation_config: dict = None, deadline: float = LLM_TIMEOUT_SECONDS) -> str:
+        return await self._call("llm", LLM_MAX_CONCURRENCY, deadline, lambda: self.llm.generate(prompt, generation_config))
+
+    async def transcribe(self, audio_path: str, language: str = None, deadline: float = STT_TIMEOUT_SECONDS) -> dict:
+        return await self._call("stt", STT_MAX_CONCURRENCY, deadline, lambda: self.stt.transcribe(audio_path, language))
+
+    async def hedge(self, primary, fallback, hedge_after: float, accept=None):
+        """
+        Awaits the primary coroutine, and starts fallback(cancelled) in a worker thread
+        once primary has run for hedge_after seconds without an accepted result, or as
+        soon as it fails. Returns (result, "primary" | "fallback") for the first accepted
+        result; the losing primary is cancelled, a losing fallback sees cancelled.set()
+        and should stop early. If nothing is accepted, returns the last result that did
+        come back, or raises the last error.
+        accept(result) -> bool decides what counts as an answer (default: not None).
+        """
+        accept = accept or (lambda result: result is not None)
+        loop = asyncio.get_running_loop()
+        cancelled = threading.Event()
+        pending = {asyncio.ensure_future(primary): "primary"}
+        started_at = loop.time()
+        fallback_started = fallback is None
+        settled = None
+        last_error = None
+
+        def start_fallback():
+            nonlocal fallback_started
+            fallback_started = True
+            pending[asyncio.ensure_future(loop.run_in_executor(None, fallback, cancelled))] = "fallback"
+
+        try:
+            while pending:
+                timeout = None
+                if not fallback_started and hedge_after > 0:
+                    timeout = max(0.0, hedge_after - (loop.time() - started_at))
+                done, _ = await asyncio.wait(set(pending), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    print(f"Provider exceeded its {hedge_after}s budget; starting the fallback")
+                    start_fallback()
+                    continue
+                for task in done:
+                    source = pending.pop(task)
+                    try:
+                        result = task.result()
+                    except Exception as e:
+                        print(f"Hedged {source} failed: {e!r}")
+                        last_error = e
+                        result = None
+                    else:
+                        if accept(result):
+                            return result, source
+                        settled = (result, source)
+                    if source == "primary" and not fallback_started:
+                        start_fallback()
+        finally:
+            cancelled.set()
+            for task in pending:
+                task.cancel()
+
+        if settled is not None:
+            return settled
+        raise last_error
+
+
+ai_clients = AIClients()
@@ -1,35 +1,276 @@
+import bisect
 import subprocess
 import json
 import re
 import os
-import google.generativeai as genai
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 from pathlib import Path
+from services.metrics import LLM_ERRORS
+from services.llm_cache import llm_cache
+from services.ai_clients import ai_clients
+from services.audio import (
+    is_pcm, load_pcm, pcm_duration, energy_envelope, blend_motion, window_means, top_windows, ENERGY_HOP_SECONDS
+)
+
+# Words that tend to mark a quotable, shareable moment in spoken content
+HOOK_WORDS = {
+    "secret", "never", "always", "why", "how", "best", "worst", "crazy", "amazing",
+    "mistake", "truth", "actually", "money", "love", "hate", "wow", "insane", "nobody",
+    "everyone", "biggest", "first", "last", "stop", "remember", "important"
+}
+WORD_RE = re.compile(r"[\w']+", re.UNICODE)
+
+# Windowed LLM analysis: the transcript is split into overlapping windows that are
+# analyzed concurrently (at most ANALYSIS_CONCURRENCY calls in flight), then the
+# candidates are merged and ranked globally. The overlap is at least one clip long so
+# a moment straddling a window edge is seen whole by one of the two windows.
+ANALYSIS_WINDOW_SECONDS = float(os.getenv("ANALYSIS_WINDOW_SECONDS", "600"))
+ANALYSIS_WINDOW_OVERLAP = float(os.getenv("ANALYSIS_WINDOW_OVERLAP", "60"))
+ANALYSIS_CONCURRENCY = int(os.getenv("ANALYSIS_CONCURRENCY", "4"))
+# Windows get wider rather than more numerous past this many LLM calls per transcript
+MAX_ANALYSIS_WINDOWS = int(os.getenv("MAX_ANALYSIS_WINDOWS", "16"))
+# Shortest clip accepted from the LLM (seconds)
+MIN_CLIP_SECONDS = 5.0
+# Clips covered by one Rocket content call in generate_viral_content_batch
+ROCKET_BATCH_SIZE = int(os.getenv("ROCKET_BATCH_SIZE", "8"))
+
+
+def _overlaps(a: dict, b: dict) -> bool:
+    return a["start"] < b["end"] and b["start"] < a["end"]
+
+
+def transcript_windows(segments: list, window_seconds: float, overlap_seconds: float, max_windows: int = MAX_ANALYSIS_WINDOWS) -> list:
+    """
+    Splits segments into overlapping time windows: [(window_start, window_end, segments)].
+    A transcript shorter than one window comes back as a single window.
+    Windows are widened to at least twice the overlap (so each one advances by at least
+    half its length) and as far as needed to cover the transcript in max_windows.
+    """
+    if not segments:
+        return []
+    starts = [segment["start"] for segment in segments]
+    first, last = segments[0]["start"], max(segment["end"] for segment in segments)
+    window_seconds = max(window_seconds, 2 * overlap_seconds)
+    if max_windows > 0:
+        # n windows of width w advancing by w - overlap span w + (n - 1)(w - overlap)
+        window_seconds = max(window_seconds, (last - first + (max_windows - 1) * overlap_seconds) / max_windows)
+    step = max(1.0, window_seconds - overlap_seconds)
+    windows = []
+    window_start = first
+    while True:
+        window_end = window_start + window_seconds
+        lo = bisect.bisect_left(starts, window_start)
+        hi = bisect.bisect_left(starts, window_end)
+        if hi > lo:
+            windows.append((window_start, min(window_end, last), segments[lo:hi]))
+        if window_end >= last:
+            break
+        window_start += step
+    return windows
+
+
+def rank_candidates(candidates: list, start_bound: float = None, end_bound: float = None) -> list:
+    """
+    Reduce step of windowed analysis: drops malformed clips, clamps them to the
+    transcript, and keeps the best-scoring clip wherever candidates from
+    neighbouring windows overlap. Returns clips by descending score.
+    """
+    valid = []
+    for clip in candidates:
+        try:
+            start, end = float(clip["start"]), float(clip["end"])
+            score = float(clip.get("score", 0) or 0)
+        except (KeyError, TypeError, ValueError):
+            continue
+        if start_bound is not None:
+            start = max(start, start_bound)
+        if end_bound is not None:
+            end = min(end, end_bound)
+        if end - start < MIN_CLIP_SECONDS:
+            continue
+        valid.append(dict(clip, start=start, end=end, score=score))
+
+    ranked = []
+    for clip in sorted(valid, key=lambda c: c["score"], reverse=True):
+        if not any(_overlaps(clip, kept) for kept in ranked):
+            ranked.append(clip)
+    return ranked
+
+
+class IncrementalMomentScorer:
+    """
+    Picks clips from transcript segments while they are still arriving.
+    Each segment start opens a candidate window [start, start + clip_duration]. A
+    window closes (and is scored) as soon as the transcript reaches its end, on
+    speech density, emphasis (! and ?) and hook words. A closed window scoring at
+    least early_score is committed immediately if it does not overlap an earlier
+    pick, so its render can start before transcription finishes; finish() fills
+    the remaining slots with the best closed windows.
+    energy: optional audio energy envelope (services.audio.energy_envelope), blended
+    into the score as a fifth of the weight.
+    """
+
+    def __init__(self, num_clips: int, clip_duration: float, early_score: float = 0.6, energy=None):
+        self.num_clips = num_clips
+        self.clip_duration = clip_duration
+        self.early_score = early_score
+        # Prefix sums of the envelope give any window's mean energy in O(1)
+        self._energy_cumsum = None
+        if energy is not None and len(energy):
+            self._energy_cumsum = np.concatenate(([0.0], np.cumsum(energy, dtype=np.float64)))
+        self.segments = []
+        self._segment_ends = []
+        # Segment indices whose windows are still open, in start order
+        self._pending = []
+        self.closed = []
+        self._closed_spans = set()
+        self.committed = []
+
+    def add_segment(self, segment: dict) -> list:
+        """
+        Feeds the next segment (in time order). Returns moments committed by it.
+        """
+        self.segments.append(segment)
+        self._segment_ends.append(segment["end"])
+        self._pending.append(len(self.segments) - 1)
+        return self._close(segment["end"], early=True)
+
+    def finish(self, duration: float = None) -> list:
+        """
+        Closes the remaining windows and fills the free slots. Returns the newly committed moments.
+        """
+        duration = duration or (self.segments[-1]["end"] if self.segments else 0.0)
+        committed = self._close(duration, early=False, duration=duration)
+        for window in sorted(self.closed, key=lambda w: w["score"], reverse=True):
+            if len(self.committed) >= self.num_clips:
+                break
+            if self._is_free(window):
+                self.committed.append(window)
+                committed.append(window)
+        return committed
+
+    def _close(self, reached: float, early: bool, duration: float = None) -> list:
+        committed = []
+        while self._pending:
+            index = self._pending[0]
+            start = self.segments[index]["start"]
+            end = start + self.clip_duration
+            if end > reached:
+                if duration is None:
+                    break
+                # Transcript is over: keep the clip length by pulling the start back
+                end = duration
+                start = max(0.0, duration - self.clip_duration)
+            self._pending.pop(0)
+            if (start, end) in self._closed_spans:
+                continue
+            self._closed_spans.add((start, end))
+            window = self._score(start, end)
+            self.closed.append(window)
+            if early and window["score"] >= self.early_score and len(self.committed) < self.num_clips and self._is_free(window):
+                self.committed.append(window)
+                committed.append(window)
+        return committed
+
+    def _is_free(self, window: dict) -> bool:
+        return not any(_overlaps(window, picked) for picked in self.committed)
+
+    def _score(self, start: float, end: float) -> dict:
+        words = 0
+        emphasis = 0
+        hooks = 0
+        # First segment ending after the window start; stop at the first one starting past its end
+        for segment in self.segments[bisect.bisect_right(self._segment_ends, start):]:
+            if segment["start"] >= end:
+                break
+            text = segment.get("text", "")
+            tokens = WORD_RE.findall(text.lower())
+            words += len(tokens)
+            emphasis += text.count("!") + text.count("?")
+            hooks += sum(1 for token in tokens if token in HOOK_WORDS)
+        length = max(end - start, 1e-6)
+        score = (
+            0.5 * min(1.0, words / length / 3.0)
+            + 0.25 * min(1.0, emphasis / 4.0)
+            + 0.25 * min(1.0, hooks / 3.0)
+        )
+        if self._energy_cumsum is not None:
+            last = len(self._energy_cumsum) - 1
+            first_frame = min(last, int(start / ENERGY_HOP_SECONDS))
+            end_frame = min(last, max(first_frame + 1, int(end / ENERGY_HOP_SECONDS)))
+            energy = (self._energy_cumsum[end_frame] - self._energy_cumsum[first_frame]) / max(1, end_frame - first_frame)
+            score = 0.8 * score + 0.2 * float(energy)
+        return {
+            "start": round(start, 3),
+            "end": round(end, 3),
+            "score": round(score, 3),
+            "reason": "Transcript scoring (speech density, emphasis, hooks, audio energy)"
+        }
 
 class ContentAnalyzer:
     def __init__(self):
-        self.api_key = os.getenv("GEMINI_API_KEY")
-        if self.api_key:
-            genai.configure(api_key=self.api_key)
-            self.model = genai.GenerativeModel("gemini-1.5-flash")
-        else:
-            self.model = None
+        if not self.model:
             print("GEMINI_API_KEY not found. Analysis will fallback to heuristic.")
 
+    @property
+    def model(self):
+        """
+        The configured LLM provider (see services/ai_clients.py), or None without one.
+        """
+        return ai_clients.llm if ai_clients.llm.available else None
+
+    @property
+    def model_name(self) -> str:
+        return ai_clients.llm.model_name
+
 
-    def analyze_transcript(self, transcript_text: str, segments: list, duration: int = 60) -> list:
+    def analyze_transcript(self, transcript_text: str, segments: list, duration: int = 60, num_clips: int = 4,
+                           cancelled: threading.Event = None) -> list:
         """
-        Analyzes the transcript to find the most viral/engaging segment.
-        Returns a list of clips with start/end times.
+        Analyzes the transcript to find the most viral/engaging segments.
+        Long transcripts are analyzed as overlapping windows, concurrently, so the whole
+        video is covered in about the latency of one call (see transcript_windows).
+        Once cancelled is set, windows not yet sent to the LLM are skipped.
+        Returns a list of clips with start/end times, best first.
         """
         if not self.model:
             print("No Gemini Model available for analysis. Using heuristics.")
             return []
 
+        windows = transcript_windows(segments, ANALYSIS_WINDOW_SECONDS, max(ANALYSIS_WINDOW_OVERLAP, duration))
+        if not windows:
+            return []
+        print(f"Analyzing {len(windows)} transcript window(s), up to {ANALYSIS_CONCURRENCY} at a time")
+
+        if len(windows) == 1:
+            candidates = self._analyze_window(windows[0][2], duration, num_clips, cancelled)
+        else:
+            with ThreadPoolExecutor(max_workers=min(ANALYSIS_CONCURRENCY, len(windows)), thread_name_prefix="analysis") as executor:
+                results = executor.map(lambda window: self._analyze_window(window[2], duration, num_clips, cancelled), windows)
+                candidates = [clip for clips in results for clip in clips]
+
+        return rank_candidates(candidates, windows[0][0], windows[-1][1])
+
+    def _analyze_window(self, segments: list, duration: int, num_clips: int, cancelled: threading.Event = None) -> list:
+        """
+        One LLM call over a slice of the transcript. Returns its candidate clips ([] on error
+        or once cancelled).
+        """
+        if cancelled is not None and cancelled.is_set():
+            return []
+        # Words are not needed to pick moments and would multiply the prompt size
+        compact = [
+            {"start": round(segment["start"], 2), "end": round(segment["end"], 2), "text": segment.get("text", "").strip()}
+            for segment in segments
+        ]
         prompt = f"""
         Analyze the following video transcript segments and identify the most viral, funny, or engaging parts suitable for YouTube Shorts (under {duration} seconds each).
+        Return at most {num_clips} clips.
         
         Transcript Segments:
-        {json.dumps(segments[:100])} ... (truncated)
+        {json.dumps(compact, ensure_ascii=False)}
 
         Return strictly valid JSON in this format:
         [
@@ -52,10 +293,7 @@ class ContentAnalyzer:
         """
 
         try:
-            response = self.model.generate_content(prompt, generation_config={"response_mime_type": "application/json"})
-            
-            content = response.text
-            viral_clips = json.loads(content)
+            viral_clips = self._generate_json(prompt)
             
             # Normalize if the LLM returns an object instead of list
             if isinstance(viral_clips, dict) and "clips" in viral_clips:
@@ -65,12 +303,31 @@ class ContentAnalyzer:
                  # Try to find a list or just wrap the dict
                  return [viral_clips] # blind hope
             
-            return viral_clips
+            return [clip for clip in viral_clips if isinstance(clip, dict)]
 
         except Exception as e:
             print(f"Analysis error: {e}")
+            LLM_ERRORS.inc(operation="analyze_transcript")
             return []
 
+    def _generate_json(self, prompt: str):
+        """
+        LLM call returning parsed JSON, served from the persistent LLM cache when the
+        same model, prompt and config were answered before. Only responses that parse are
+        cached, so a malformed answer is retried next time. The call itself goes through
+        ai_clients, which applies the deadline and the concurrency limit.
+        """
+        generation_config = {"response_mime_type": "application/json"}
+        key = llm_cache.key(self.model_name, prompt, generation_config)
+        cached = llm_cache.get(key)
+        if cached is not None:
+            return json.loads(cached)
+
+        content = ai_clients.run(ai_clients.generate(prompt, generation_config))
+        result = json.loads(content)
+        llm_cache.put(key, content)
+        return result
+
     def generate_viral_content(self, video_context: str, clip_title: str = "", clip_reason: str = "") -> dict:
         """
         Generates viral captions, descriptions, and hashtags for social media sharing.
@@ -120,9 +377,7 @@ class ContentAnalyzer:
         """
 
         try:
-            response = self.model.generate_content(prompt, generation_config={"response_mime_type": "application/json"})
-            content = response.text
-            result = json.loads(content)
+            result = self._generate_json(prompt)
             
             # Ensure hashtags have # prefix
             if "hashtags" in result:
@@ -132,19 +387,143 @@ class ContentAnalyzer:
 
         except Exception as e:
             print(f"Viral content generation error: {e}")
-            return {
-                "title": clip_title or "Must Watch! 🔥",
-                "description": clip_reason or "You need to see this!",
-                "hashtags": ["#viral", "#trending", "#fyp", "#foryou", "#explore", "#mustwatch"],
-                "caption_instagram": f"{clip_title}\n\n#viral #trending #fyp",
-                "caption_youtube": clip_title or "Check this out!"
-            }
+            LLM_ERRORS.inc(operation="generate_viral_content")
+            return self._default_viral_content(clip_title, clip_reason)
 
-    def detect_high_energy_moments(self, video_path: str, num_clips: int = 4, clip_duration: int = 60) -> list:
+    def generate_viral_content_batch(self, video_context: str, clips: list) -> list:
         """
-        Fallback: Selects interesting parts based on position (evenly distributed).
+        generate_viral_content for every clip of a job at once. clips are dicts with
+        optional "title", "reason" and "excerpt" (the clip's own transcript text).
+        Clips are sent ROCKET_BATCH_SIZE per LLM call, and the calls run concurrently,
+        so a whole job costs about one call's latency. Returns one content dict per
+        clip, in order; clips the model skipped get the default content.
+        """
+        if not clips:
+            return []
+        if not self.model:
+            return [
+                self.generate_viral_content(video_context, clip.get("title", ""), clip.get("reason", ""))
+                for clip in clips
+            ]
+
+        batches = [clips[i:i + ROCKET_BATCH_SIZE] for i in range(0, len(clips), ROCKET_BATCH_SIZE)]
+        if len(batches) == 1:
+            return self._viral_content_batch(video_context, batches[0])
+        with ThreadPoolExecutor(max_workers=min(ANALYSIS_CONCURRENCY, len(batches)), thread_name_prefix="rocket") as executor:
+            results = executor.map(lambda batch: self._viral_content_batch(video_context, batch), batches)
+            return [content for contents in results for content in contents]
+
+    def _viral_content_batch(self, video_context: str, clips: list) -> list:
+        """
+        One LLM call producing Rocket content for up to ROCKET_BATCH_SIZE clips.
+        """
+        clip_lines = "\n".join(
+            f"Clip {i}: title hint: {clip.get('title', '')} | why it's interesting: {clip.get('reason', '')}"
+            f" | transcript: {clip.get('excerpt', '')[:1000]}"
+            for i, clip in enumerate(clips)
+        )
+        prompt = f"""
+        Analyze these clips from one video and generate viral social media content for each.
+
+        Video Context/Transcript: {video_context[:2000]}
+
+        {clip_lines}
+
+        Generate content optimized for MAXIMUM VIRALITY on Instagram and YouTube.
+        Make each clip's content specific to that clip; do not reuse titles across clips.
+        Return strictly valid JSON, one object per clip:
+        [
+            {{
+                "clip": <clip number>,
+                "title": "<catchy 5-10 word viral title with emoji>",
+                "description": "<engaging 2-3 sentence description with hook and call-to-action>",
+                "hashtags": ["<hashtag1>", "<hashtag2>", ... 15 trending hashtags without # symbol],
+                "caption_instagram": "<full Instagram caption with emojis, line breaks, and hashtags at end>",
+                "caption_youtube": "<YouTube description with timestamps placeholder and call-to-action>"
+            }}
+        ]
+
+        Focus on:
+        - Curiosity-inducing hooks ("You won't believe...", "This changed everything...")
+        - Emotional triggers
+        - Trending hashtags for 2024/2025
+        - Platform-specific optimization
+        """
+
+        by_clip = {}
+        try:
+            result = self._generate_json(prompt)
+            for item in result if isinstance(result, list) else []:
+                try:
+                    index = int(item["clip"])
+                except (KeyError, TypeError, ValueError):
+                    continue
+                if "hashtags" in item:
+                    item["hashtags"] = [f"#{str(tag).lstrip('#')}" for tag in item["hashtags"]]
+                item.pop("clip")
+                by_clip[index] = item
+        except Exception as e:
+            print(f"Viral content generation error: {e}")
+            LLM_ERRORS.inc(operation="generate_viral_content")
+
+        return [
+            by_clip.get(i) or self._default_viral_content(clip.get("title", ""), clip.get("reason", ""))
+            for i, clip in enumerate(clips)
+        ]
+
+    def _default_viral_content(self, clip_title: str = "", clip_reason: str = "") -> dict:
+        return {
+            "title": clip_title or "Must Watch! 🔥",
+            "description": clip_reason or "You need to see this!",
+            "hashtags": ["#viral", "#trending", "#fyp", "#foryou", "#explore", "#mustwatch"],
+            "caption_instagram": f"{clip_title}\n\n#viral #trending #fyp",
+            "caption_youtube": clip_title or "Check this out!"
+        }
+
+    def detect_high_energy_moments(self, video_path: str, num_clips: int = 4, clip_duration: int = 60, audio_path: str = None, motion: list = None) -> list:
+        """
+        Fallback: Selects the loudest / most animated windows of the audio.
+        audio_path: decoded PCM (VideoProcessor.decode_audio). An energy envelope
+        (RMS loudness + spectral flux) is computed over it and the top clip_duration
+        windows win, overlapping only when num_clips do not fit side by side. Without
+        usable audio, clips are spaced evenly.
+        motion: per-second motion scores (SceneIndex.motion), blended into the envelope.
+        """
+        if audio_path and is_pcm(audio_path):
+            try:
+                clips = self._energy_moments(audio_path, num_clips, clip_duration, motion)
+                if clips:
+                    return clips
+            except Exception as e:
+                print(f"Energy analysis failed, spacing clips evenly: {e}")
+        return self._evenly_spaced_moments(video_path, num_clips, clip_duration)
+
+    def _energy_moments(self, audio_path: str, num_clips: int, clip_duration: int, motion: list = None) -> list:
+        samples = load_pcm(audio_path)
+        duration = pcm_duration(samples)
+        if duration <= clip_duration:
+            return [{"start": 0, "end": duration, "score": 1.0, "reason": "Full video (short)"}]
+
+        envelope = energy_envelope(samples)
+        if motion:
+            envelope = blend_motion(envelope, motion)
+        window = int(round(clip_duration / ENERGY_HOP_SECONDS))
+        scores = window_means(envelope, window)
+        clips = []
+        for index in top_windows(scores, window, num_clips):
+            start = index * ENERGY_HOP_SECONDS
+            clips.append({
+                "start": round(start, 3),
+                "end": round(min(duration, start + clip_duration), 3),
+                "score": round(float(scores[index]), 3),
+                "reason": "High audio energy and motion" if motion else "High audio energy (loudness + spectral flux)"
+            })
+        return clips
+
+    def _evenly_spaced_moments(self, video_path: str, num_clips: int, clip_duration: int) -> list:
+        """
+        Selects interesting parts based on position (evenly distributed).
         """
-        duration = self.get_video_duration(video_path)
         duration = self.get_video_duration(video_path)
         if not duration:
             print("Warning: Could not determine video duration. Assuming 10 minutes (600s) fallback to generate clips.")
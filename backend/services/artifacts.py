@@ -0,0 +1,166 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+
+# Outside processed/, which is served publicly under /static
+ARTIFACT_DIR = os.getenv("ARTIFACT_DIR", "cache/artifacts")
+# Size cap; least recently used artifacts are deleted beyond it
+ARTIFACT_CACHE_MAX_GB = float(os.getenv("ARTIFACT_CACHE_MAX_GB", "10"))
+# Artifacts used this recently are never evicted (a running job may still read them)
+ARTIFACT_MIN_AGE_SECONDS = 3600.0
+
+
+class ArtifactStore:
+    """
+    Content-addressed cache for pipeline stage outputs (trimmed source, audio,
+    transcript, moments).
+    Keys are derived from a hash of the source file content plus the stage
+    parameters, so the same video submitted again (even re-uploaded under a new
+    file_id) skips straight to the stages whose parameters actually changed.
+    A hit refreshes the artifact's mtime, and every put evicts the least recently
+    used artifacts once the store holds more than max_gb.
+    """
+
+    def __init__(self, root: str = ARTIFACT_DIR, max_gb: float = ARTIFACT_CACHE_MAX_GB):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.enabled = os.getenv("ARTIFACT_CACHE", "1") != "0"
+        self.max_bytes = int(max_gb * 1024 ** 3)
+        # (path, size, mtime) -> content hash, so a file is only read once per process
+        self._hash_memo = {}
+        self._lock = threading.Lock()
+
+    def source_hash(self, path: str) -> str:
+        """
+        SHA-256 of the file content, memoized on (path, size, mtime).
+        """
+        path = Path(path).absolute()
+        stat = path.stat()
+        memo_key = (str(path), stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            cached = self._hash_memo.get(memo_key)
+        if cached:
+            return cached
+
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+        content_hash = digest.hexdigest()
+
+        with self._lock:
+            self._hash_memo[memo_key] = content_hash
+        return content_hash
+
+    def key(self, stage: str, source: str, **params) -> str:
+        """
+        Stable key for a stage output: stage name + source identity + stage parameters.
+        """
+        payload = json.dumps({"stage": stage, "source": source, "params": params}, sort_keys=True, default=str)
+        return f"{stage}_{hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32]}"
+
+    def get_json(self, key: str):
+        """
+        Returns the cached JSON value, or None on a miss.
+        """
+        if not self.enabled:
+            return None
+        path = self.root / f"{key}.json"
+        if not path.exists():
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                value = json.load(f)
+        except Exception as e:
+            print(f"Ignoring unreadable artifact {path}: {e}")
+            return None
+        self._touch(path)
+        return value
+
+    def put_json(self, key: str, value):
+        if not self.enabled:
+            return
+        path = self.root / f"{key}.json"
+        tmp_path = self.root / f"{key}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(value, f, ensure_ascii=False, default=str)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"Failed to store artifact {key}: {e}")
+            if tmp_path.exists():
+                tmp_path.unlink()
+            return
+        self._evict()
+
+    def get_file(self, key: str, suffix: str):
+        """
+        Returns the path of a cached file artifact, or None on a miss.
+        """
+        if not self.enabled:
+            return None
+        path = self.root / f"{key}{suffix}"
+        if not path.exists():
+            return None
+        self._touch(path)
+        return path
+
+    def temp_path(self, key: str, suffix: str) -> Path:
+        """
+        Scratch path to produce a file artifact into. The real suffix is kept last
+        so tools like ffmpeg still infer the container from it.
+        """
+        return self.root / f"{key}.{uuid.uuid4().hex}.tmp{suffix}"
+
+    def put_file(self, key: str, suffix: str, produced_path: str) -> Path:
+        """
+        Atomically moves a finished file (usually from temp_path) into the store.
+        """
+        path = self.root / f"{key}{suffix}"
+        os.replace(produced_path, path)
+        self._evict()
+        return path
+
+    def _touch(self, path: Path):
+        # mtime doubles as the last-used time for eviction
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def _evict(self):
+        """
+        Deletes least recently used artifacts until the store fits in max_bytes.
+        Anything used within ARTIFACT_MIN_AGE_SECONDS stays, as do scratch files
+        still being written (abandoned ones go once they are that old).
+        """
+        now = time.time()
+        entries = []
+        total = 0
+        for path in self.root.iterdir():
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            if not path.is_file():
+                continue
+            total += stat.st_size
+            entries.append((stat.st_mtime, stat.st_size, path))
+        if total <= self.max_bytes:
+            return
+        with self._lock:
+            for mtime, size, path in sorted(entries):
+                if total <= self.max_bytes or now - mtime < ARTIFACT_MIN_AGE_SECONDS:
+                    break
+                try:
+                    path.unlink()
+                    total -= size
+                except OSError:
+                    pass
+
+
+artifact_store = ArtifactStore()
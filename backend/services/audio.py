@@ -0,0 +1,189 @@
+"""
+Shared decoded audio: one FFmpeg decode per source to raw 16 kHz mono float32 PCM
+(the format Whisper models consume), read back as a memory-mapped NumPy array.
+Transcription, energy analysis and silence detection all work on the same pages
+without decoding or copying the audio again.
+"""
+
+import os
+from pathlib import Path
+import numpy as np
+
+SAMPLE_RATE = 16000
+PCM_DTYPE = np.float32
+# Raw little-endian float32 samples, no header (ffmpeg -f f32le)
+PCM_SUFFIX = ".f32"
+
+
+def is_pcm(path) -> bool:
+    return Path(path).suffix == PCM_SUFFIX
+
+
+def load_pcm(path) -> np.ndarray:
+    """
+    Read-only memory map of a PCM file written by VideoProcessor.decode_audio.
+    """
+    if Path(path).stat().st_size == 0:
+        # np.memmap refuses empty files (silent/zero-length sources)
+        return np.zeros(0, dtype=PCM_DTYPE)
+    return np.memmap(path, dtype=PCM_DTYPE, mode="r")
+
+
+def pcm_duration(samples: np.ndarray) -> float:
+    return len(samples) / SAMPLE_RATE
+
+
+def frame_rms(samples: np.ndarray, frame_seconds: float = 0.05) -> np.ndarray:
+    """
+    RMS level of consecutive non-overlapping frames (trailing partial frame dropped).
+    """
+    frame = max(1, int(frame_seconds * SAMPLE_RATE))
+    count = len(samples) // frame
+    if count == 0:
+        return np.zeros(0, dtype=PCM_DTYPE)
+    frames = samples[:count * frame].reshape(count, frame)
+    return np.sqrt(np.mean(np.square(frames, dtype=np.float64), axis=1)).astype(PCM_DTYPE)
+
+
+def find_silences(samples: np.ndarray, threshold_db: float = -40.0, min_silence: float = 0.5,
+                  frame_seconds: float = 0.05) -> list:
+    """
+    Returns [(start, end)] in seconds of stretches quieter than threshold_db (dBFS)
+    lasting at least min_silence.
+    """
+    rms = frame_rms(samples, frame_seconds)
+    if len(rms) == 0:
+        return []
+    quiet = rms < 10 ** (threshold_db / 20)
+    # Edges of quiet runs: +1 where a run starts, -1 one past where it ends
+    edges = np.diff(np.concatenate(([0], quiet.view(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    min_frames = int(np.ceil(min_silence / frame_seconds))
+    keep = (ends - starts) >= min_frames
+    return [
+        (round(float(s) * frame_seconds, 3), round(float(e) * frame_seconds, 3))
+        for s, e in zip(starts[keep], ends[keep])
+    ]
+
+
+def plan_chunks(samples: np.ndarray, target_seconds: float, search_seconds: float = 15.0) -> list:
+    """
+    Splits the audio into [(start, end)] second ranges of roughly target_seconds,
+    cutting in the middle of the silence closest to each ideal split point (within
+    search_seconds) so no word straddles two chunks. Falls back to a hard cut when
+    there is no silence nearby.
+    """
+    duration = pcm_duration(samples)
+    silences = find_silences(samples, min_silence=0.3)
+    midpoints = np.array([(s + e) / 2 for s, e in silences], dtype=np.float64)
+
+    chunks = []
+    cursor = 0.0
+    # Leave the tail in the last chunk rather than creating a sliver
+    while duration - cursor > target_seconds * 1.5:
+        ideal = cursor + target_seconds
+        cut = ideal
+        if len(midpoints):
+            i = int(np.searchsorted(midpoints, ideal))
+            nearby = [midpoints[j] for j in (i - 1, i) if 0 <= j < len(midpoints)]
+            nearest = min(nearby, key=lambda m: abs(m - ideal))
+            if abs(nearest - ideal) <= search_seconds and nearest > cursor:
+                cut = float(nearest)
+        chunks.append((round(cursor, 3), round(cut, 3)))
+        cursor = cut
+    chunks.append((round(cursor, 3), round(duration, 3)))
+    return chunks
+
+
+# Hop between energy frames; 10 frames per second is plenty to place clip boundaries
+ENERGY_HOP_SECONDS = 0.1
+# FFT size for spectral flux (16 ms at 16 kHz), taken from the start of each hop
+FLUX_FFT_SIZE = 256
+# Frames per FFT batch, bounds the spectrum buffer to a few MB
+FLUX_BATCH_FRAMES = 4096
+# Share of visual motion (scene index) in the energy score, when it is available
+MOTION_WEIGHT = float(os.getenv("MOTION_WEIGHT", "0.3"))
+
+
+def _normalize(values: np.ndarray) -> np.ndarray:
+    """
+    Scales to 0-1 between the 5th and 95th percentiles so a few spikes do not flatten the rest.
+    """
+    if len(values) == 0:
+        return values
+    low, high = np.percentile(values, [5, 95])
+    if high - low < 1e-9:
+        return np.zeros_like(values)
+    return np.clip((values - low) / (high - low), 0.0, 1.0)
+
+
+def energy_envelope(samples: np.ndarray, hop_seconds: float = ENERGY_HOP_SECONDS) -> np.ndarray:
+    """
+    Per-hop "energy" in 0-1: loudness (RMS in dB) blended with spectral flux (how much
+    the spectrum changes, i.e. onsets, laughter, music hits). One vectorized pass.
+    """
+    hop = max(FLUX_FFT_SIZE, int(hop_seconds * SAMPLE_RATE))
+    count = len(samples) // hop
+    if count == 0:
+        return np.zeros(0, dtype=np.float32)
+    frames = samples[:count * hop].reshape(count, hop)
+
+    # Row-wise dot product: mean square without materializing squared frames
+    loudness = 10 * np.log10(np.einsum("ij,ij->i", frames, frames) / hop + 1e-10)
+
+    window = np.hanning(FLUX_FFT_SIZE).astype(np.float32)
+    flux = np.zeros(count, dtype=np.float32)
+    previous = None
+    for begin in range(0, count, FLUX_BATCH_FRAMES):
+        block = frames[begin:begin + FLUX_BATCH_FRAMES, :FLUX_FFT_SIZE] * window
+        magnitude = np.abs(np.fft.rfft(block, axis=1)).astype(np.float32)
+        if previous is not None:
+            magnitude_prev = np.vstack((previous, magnitude[:-1]))
+        else:
+            magnitude_prev = np.vstack((magnitude[:1], magnitude[:-1]))
+        flux[begin:begin + len(block)] = np.maximum(magnitude - magnitude_prev, 0).sum(axis=1)
+        previous = magnitude[-1:]
+
+    return (0.6 * _normalize(loudness) + 0.4 * _normalize(np.log1p(flux))).astype(np.float32)
+
+
+def blend_motion(envelope: np.ndarray, motion: list, hop_seconds: float = ENERGY_HOP_SECONDS, weight: float = MOTION_WEIGHT) -> np.ndarray:
+    """
+    Mixes per-second motion scores (SceneIndex.motion) into an energy envelope, so a
+    busy shot outranks a static one that is just as loud.
+    """
+    if len(envelope) == 0 or not motion or weight <= 0:
+        return envelope
+    seconds = np.minimum((np.arange(len(envelope)) * hop_seconds).astype(int), len(motion) - 1)
+    per_hop = _normalize(np.asarray(motion, dtype=np.float32))[seconds]
+    return ((1.0 - weight) * envelope + weight * per_hop).astype(np.float32)
+
+
+def window_means(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    Mean of every length-`window` run of values (index = run start), via a cumulative sum.
+    """
+    if window <= 0 or len(values) < window:
+        return np.zeros(0, dtype=np.float64)
+    cumulative = np.concatenate(([0.0], np.cumsum(values, dtype=np.float64)))
+    return (cumulative[window:] - cumulative[:-window]) / window
+
+
+def top_windows(scores: np.ndarray, window: int, k: int) -> list:
+    """
+    Start indices of the k best-scoring runs, best first. Runs that do not overlap are
+    taken first (greedy); if fewer than k fit, the required spacing is halved until k
+    are found, so the remaining picks overlap as little as possible.
+    """
+    picked = []
+    order = np.argsort(scores)[::-1]
+    gap = max(1, window)
+    while len(picked) < min(k, len(scores)):
+        for index in order:
+            if len(picked) >= k:
+                break
+            if all(abs(int(index) - other) >= gap for other in picked):
+                picked.append(int(index))
+        gap //= 2
+    return picked
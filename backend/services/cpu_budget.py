@@ -0,0 +1,64 @@
+import os
+import threading
+from contextlib import contextmanager
+from services.metrics import registry
+
+# Threads all FFmpeg encoders and Whisper models in this process may use together
+CPU_BUDGET = int(os.getenv("CPU_BUDGET", str(os.cpu_count() or 1)))
+# Upper bound for a single FFmpeg run (0: the whole budget)
+FFMPEG_MAX_THREADS = int(os.getenv("FFMPEG_MAX_THREADS", "0"))
+
+
+class CpuGovernor:
+    """
+    Hands out thread counts so concurrent encodes and transcriptions share the CPU
+    instead of each sizing itself to every core.
+
+    lease() grants the free part of the budget, but never less than a fair share
+    (budget / (active leases + 1)), so a task arriving while the machine is busy still
+    gets a useful slice and oversubscription stays bounded. lease(threads=n) reserves
+    a fixed amount for work whose thread count is already decided (a loaded Whisper
+    model), so adaptive leases see it as load.
+    """
+
+    def __init__(self, budget: int = CPU_BUDGET, max_per_lease: int = FFMPEG_MAX_THREADS):
+        self.budget = max(1, budget)
+        self.max_per_lease = max_per_lease or self.budget
+        self._leases = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def share(self, parts: int) -> int:
+        """
+        Even split of the budget, for sizing long-lived workers up front.
+        """
+        return max(1, self.budget // max(1, parts))
+
+    def in_use(self) -> int:
+        with self._lock:
+            return sum(self._leases.values())
+
+    @contextmanager
+    def lease(self, threads: int = None):
+        with self._lock:
+            if threads is None:
+                free = self.budget - sum(self._leases.values())
+                fair = self.budget // (len(self._leases) + 1)
+                threads = min(self.max_per_lease, max(free, fair, 1))
+            lease_id = self._next_id
+            self._next_id += 1
+            self._leases[lease_id] = threads
+        try:
+            yield threads
+        finally:
+            with self._lock:
+                del self._leases[lease_id]
+
+
+cpu_governor = CpuGovernor()
+
+registry.gauge(
+    "autoshorts_cpu_threads_leased",
+    "Threads currently leased to FFmpeg encodes and Whisper transcriptions.",
+    callback=cpu_governor.in_use
+)
@@ -1,12 +1,18 @@
 import yt_dlp
 from pathlib import Path
+from concurrent.futures import Future, ThreadPoolExecutor
+import os
+import requests
 import uuid
 from services.video_processing import video_processor
+from services.audio import PCM_SUFFIX
 
 class VideoDownloader:
     def __init__(self, download_dir: str = "uploads"):
         self.download_dir = Path(download_dir)
         self.download_dir.mkdir(exist_ok=True)
+        # Background downloads (start_download): video + early audio per job
+        self.executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="download")
 
     def download_video(self, url: str) -> str:
         """
@@ -16,41 +22,103 @@ class VideoDownloader:
         If not, falls back to local yt-dlp.
         Returns the absolute path to the downloaded file.
         """
-        import os
-        import requests
-        import shutil
-
         file_id = str(uuid.uuid4())
-        # Template: uploads/UUID.mp4
-        output_template = str(self.download_dir / f"{file_id}.%(ext)s")
-        local_filename = str(self.download_dir / f"{file_id}.mp4")
 
         # 1. Remote Downloader Strategy
-        remote_api = os.getenv("DOWNLOADER_API_URL")
-        if remote_api:
-            print(f"DEBUG: Using remote downloader at {remote_api}")
+        if os.getenv("DOWNLOADER_API_URL"):
             try:
-                # Ensure URL ends with /download if not provided
-                endpoint = remote_api if remote_api.endswith("/download") else f"{remote_api.rstrip('/')}/download"
-                
-                with requests.get(endpoint, params={"url": url}, stream=True, timeout=600) as r:
-                    r.raise_for_status()
-                    # Determine extension from headers if possible, or default to mp4
-                    # For now, just save as mp4 since we requested mp4/best
-                    with open(local_filename, 'wb') as f:
-                        for chunk in r.iter_content(chunk_size=8192): 
-                            f.write(chunk)
-                
-                print(f"DEBUG: Remote download successful: {local_filename}")
-                return str(Path(local_filename).absolute())
+                return self._download_remote(url, file_id)
             except Exception as e:
                 print(f"ERROR: Remote download failed: {e}")
                 print("Falling back to local download...")
                 # Fallthrough to local strategies
-        
+
         # 2. Local Strategies (Original Logic)
+        return self._download_local(url, file_id)
+
+    def start_download(self, url: str) -> "StreamingDownload":
+        """
+        Starts download_video in the background and makes the audio track available early.
+        - Local yt-dlp: the (much smaller) audio-only format is fetched in parallel with
+          the full video, as a second request. It usually finishes long before the video,
+          so transcription overlaps the rest of the download.
+        - Remote downloader: the service only streams the muxed file, so there is no
+          overlap. The streamed bytes are teed into an FFmpeg audio tap instead, and the
+          PCM is ready when the last chunk lands (no separate extract pass afterwards).
+        The audio is best effort; if it fails the caller decodes it from the video as before.
+        The early audio file is the caller's to delete once transcription is done with it.
+        """
+        file_id = str(uuid.uuid4())
+
+        if os.getenv("DOWNLOADER_API_URL"):
+            audio_future = Future()
+            video_future = self.executor.submit(self._download_remote_streaming, url, file_id, audio_future)
+        else:
+            audio_future = self.executor.submit(self._download_local, url, file_id, True)
+            video_future = self.executor.submit(self._download_local, url, file_id)
+
+        return StreamingDownload(video_future, audio_future)
+
+    def _download_remote(self, url: str, file_id: str, on_chunk=None) -> str:
+        """
+        Streams the file from the DOWNLOADER_API_URL microservice to uploads/{file_id}.mp4.
+        on_chunk, if given, receives every chunk as it is written (audio tap).
+        """
+        remote_api = os.getenv("DOWNLOADER_API_URL")
+        local_filename = str(self.download_dir / f"{file_id}.mp4")
+        print(f"DEBUG: Using remote downloader at {remote_api}")
+
+        # Ensure URL ends with /download if not provided
+        endpoint = remote_api if remote_api.endswith("/download") else f"{remote_api.rstrip('/')}/download"
+        
+        with requests.get(endpoint, params={"url": url}, stream=True, timeout=600) as r:
+            r.raise_for_status()
+            # Determine extension from headers if possible, or default to mp4
+            # For now, just save as mp4 since we requested mp4/best
+            with open(local_filename, 'wb') as f:
+                for chunk in r.iter_content(chunk_size=8192): 
+                    f.write(chunk)
+                    if on_chunk:
+                        on_chunk(chunk)
+        
+        print(f"DEBUG: Remote download successful: {local_filename}")
+        return str(Path(local_filename).absolute())
+
+    def _download_remote_streaming(self, url: str, file_id: str, audio_future: Future) -> str:
+        """
+        Remote download with an audio tap; resolves audio_future when the tap finishes.
+        """
+        audio_path = self.download_dir / f"{file_id}_audio{PCM_SUFFIX}"
+        tap = video_processor.open_audio_tap(str(audio_path))
+        try:
+            video_path = self._download_remote(url, file_id, on_chunk=tap.write)
+        except Exception as e:
+            tap.abort()
+            audio_path.unlink(missing_ok=True)
+            audio_future.set_exception(e)
+            print(f"ERROR: Remote download failed: {e}")
+            print("Falling back to local download...")
+            return self._download_local(url, file_id)
+
+        try:
+            audio_future.set_result(str(Path(tap.close()).absolute()))
+        except Exception as e:
+            print(f"Audio tap unusable, audio will be extracted after download: {e}")
+            audio_path.unlink(missing_ok=True)
+            audio_future.set_exception(e)
+        return video_path
+
+    def _download_local(self, url: str, file_id: str, audio_only: bool = False) -> str:
+        """
+        Downloads with local yt-dlp, trying several network strategies.
+        audio_only fetches just the best audio format to uploads/{file_id}_audio.<ext>.
+        """
+        name = f"{file_id}_audio" if audio_only else file_id
+        # Template: uploads/UUID.mp4
+        output_template = str(self.download_dir / f"{name}.%(ext)s")
+
         ydl_opts = {
-            'format': 'bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best',
+            'format': 'bestaudio[ext=m4a]/bestaudio' if audio_only else 'bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best',
             'outtmpl': output_template,
             'noplaylist': True,
         }
@@ -125,7 +193,7 @@ class VideoDownloader:
                     # Success!
                     # Find extracted file
                     # We look for files matching the ID because extensions vary (mp4, mkv, webm)
-                    for file in self.download_dir.glob(f"{file_id}.*"):
+                    for file in self.download_dir.glob(f"{name}.*"):
                         return str(file.absolute())
                     
                     # Fallback if file not found by glob (shouldnt happen with outtmpl)
@@ -141,4 +209,31 @@ class VideoDownloader:
         print(f"All download strategies failed. Last error: {last_error}")
         raise last_error
 
+
+class StreamingDownload:
+    """
+    Handle for a download started with VideoDownloader.start_download.
+    """
+
+    def __init__(self, video_future: Future, audio_future: Future):
+        self.video_future = video_future
+        self.audio_future = audio_future
+
+    def wait_audio(self) -> str:
+        """
+        Blocks until the early audio track is ready. Returns its path, or None if it
+        could not be produced (the caller then extracts audio from the video).
+        """
+        try:
+            return self.audio_future.result()
+        except Exception as e:
+            print(f"Early audio unavailable: {e}")
+            return None
+
+    def wait_video(self) -> str:
+        """
+        Blocks until the video is downloaded and returns its path (raises on failure).
+        """
+        return self.video_future.result()
+
 downloader = VideoDownloader()
@@ -0,0 +1,233 @@
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from services.metrics import registry
+
+# Job snapshots live outside processed/, which is served publicly under /static
+JOBS_DIR = os.getenv("JOBS_DIR", "cache/jobs")
+# Finished jobs are dropped from memory (and their snapshots from disk) after this long
+JOB_TTL_SECONDS = float(os.getenv("JOB_TTL_SECONDS", str(24 * 3600)))
+# Minimum time between two prune passes
+JOB_PRUNE_INTERVAL_SECONDS = 60.0
+# Progress events are only recorded when the percentage moved at least this much
+PROGRESS_EVENTS = ("transcription_progress", "render_progress")
+PROGRESS_STEP_PERCENT = 5
+# Per-job event log size; the oldest events are dropped beyond it
+MAX_JOB_EVENTS = 500
+
+
+class Job:
+    """
+    State of one background processing job.
+    Every mutation goes through the lock so the polling endpoint never sees a
+    half-written clip list.
+    """
+
+    def __init__(self, job_id: str, params: dict = None):
+        self.job_id = job_id
+        self.params = params or {}
+        self.status = "queued"  # queued -> running -> completed | failed
+        self.stage = "queued"
+        self.clips = []
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+        # Progress log for streaming listeners; ids keep counting when old events are dropped
+        self.events = []
+        self._dropped_events = 0
+        # Last recorded percentage per progress stream (event, clip)
+        self._progress = {}
+        self._lock = threading.Lock()
+        self._on_change = None
+
+    def update(self, **fields):
+        with self._lock:
+            for key, value in fields.items():
+                setattr(self, key, value)
+            self.updated_at = time.time()
+        self._changed()
+
+    def set_stage(self, stage: str):
+        self.update(stage=stage)
+        self.emit("stage", stage=stage)
+
+    def add_clip(self, clip: dict):
+        with self._lock:
+            self.clips.append(clip)
+            self.updated_at = time.time()
+        self._changed()
+        self.emit("clip", **clip)
+
+    def emit(self, event: str, **data):
+        """
+        Records a progress event (stage change, transcription/render progress, finished clip).
+        Events stay in memory only; the persisted snapshot carries the durable state.
+        Progress percentages are coalesced to PROGRESS_STEP_PERCENT steps, and the log
+        keeps the last MAX_JOB_EVENTS events.
+        """
+        with self._lock:
+            if event in PROGRESS_EVENTS:
+                stream = (event, data.get("clip"))
+                percent = data.get("percent", 0)
+                last = self._progress.get(stream)
+                if last is not None and percent < 100 and percent - last < PROGRESS_STEP_PERCENT:
+                    return
+                self._progress[stream] = percent
+            self.events.append({"id": self._dropped_events + len(self.events), "event": event, "data": data})
+            if len(self.events) > MAX_JOB_EVENTS:
+                overflow = len(self.events) - MAX_JOB_EVENTS
+                del self.events[:overflow]
+                self._dropped_events += overflow
+
+    def events_since(self, last_id: int = -1) -> list:
+        with self._lock:
+            return self.events[max(0, last_id + 1 - self._dropped_events):]
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("completed", "failed")
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {
+                "job_id": self.job_id,
+                "status": self.status,
+                "stage": self.stage,
+                "clips": list(self.clips),
+                "result": self.result,
+                "error": self.error,
+                "created_at": self.created_at,
+                "updated_at": self.updated_at,
+            }
+
+    def _changed(self):
+        if self._on_change:
+            self._on_change(self)
+
+
+class JobManager:
+    """
+    Runs processing pipelines on a bounded pool of background workers.
+    Job snapshots are mirrored to disk so a status request landing on another
+    uvicorn worker (or arriving after a restart) can still be answered.
+    """
+
+    def __init__(self, jobs_dir: str = JOBS_DIR, max_workers: int = None, ttl_seconds: float = JOB_TTL_SECONDS):
+        self.jobs_dir = Path(jobs_dir)
+        self.jobs_dir.mkdir(parents=True, exist_ok=True)
+        self.max_workers = max_workers or int(os.getenv("MAX_CONCURRENT_JOBS", "2"))
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="job")
+        self.ttl_seconds = ttl_seconds
+        self.jobs = {}
+        self._lock = threading.Lock()
+        self._last_prune = 0.0
+
+    def submit(self, fn, params: dict = None) -> Job:
+        """
+        Queues fn(job) on a background worker and returns the new Job immediately.
+        fn is expected to fill job.result; any exception marks the job as failed.
+        """
+        self.prune()
+        job = Job(str(uuid.uuid4()), params)
+        job._on_change = self._persist
+        with self._lock:
+            self.jobs[job.job_id] = job
+        self._persist(job)
+        self.executor.submit(self._run, job, fn)
+        return job
+
+    def count(self, status: str) -> int:
+        with self._lock:
+            return sum(1 for job in self.jobs.values() if job.status == status)
+
+    def get_live(self, job_id: str) -> Job:
+        """
+        Returns the in-memory Job (with its event log) if this process runs it, else None.
+        """
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def get(self, job_id: str) -> dict:
+        """
+        Returns the job snapshot, or None if the id is unknown.
+        """
+        with self._lock:
+            job = self.jobs.get(job_id)
+        if job:
+            return job.to_dict()
+
+        job_path = self.jobs_dir / f"{Path(job_id).name}.json"
+        if job_path.exists():
+            try:
+                with open(job_path, "r", encoding="utf-8") as f:
+                    return json.load(f)
+            except Exception as e:
+                print(f"Could not read job snapshot {job_path}: {e}")
+        return None
+
+    def prune(self, force: bool = False):
+        """
+        Forgets finished jobs older than the TTL, in memory and on disk. Running and
+        queued jobs are never touched. Cheap to call often; it scans at most once a minute.
+        """
+        now = time.time()
+        with self._lock:
+            if not force and now - self._last_prune < JOB_PRUNE_INTERVAL_SECONDS:
+                return
+            self._last_prune = now
+            expired = [
+                job_id for job_id, job in self.jobs.items()
+                if job.finished and now - job.updated_at > self.ttl_seconds
+            ]
+            for job_id in expired:
+                del self.jobs[job_id]
+            live = set(self.jobs)
+
+        for job_path in self.jobs_dir.glob("*.json"):
+            try:
+                if job_path.stem not in live and now - job_path.stat().st_mtime > self.ttl_seconds:
+                    job_path.unlink()
+            except OSError:
+                pass
+
+    def _run(self, job: Job, fn):
+        job.update(status="running", stage="starting")
+        try:
+            fn(job)
+            job.update(status="completed", stage="done")
+            job.emit("completed", result=job.result)
+        except Exception as e:
+            # HTTPException carries the user-facing message in .detail
+            error = getattr(e, "detail", None) or str(e)
+            print(f"Job {job.job_id} failed: {error}")
+            job.update(status="failed", error=error)
+            job.emit("failed", error=error)
+
+    def _persist(self, job: Job):
+        job_path = self.jobs_dir / f"{job.job_id}.json"
+        tmp_path = job_path.with_suffix(".tmp")
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(job.to_dict(), f, ensure_ascii=False, default=str)
+            os.replace(tmp_path, job_path)
+        except Exception as e:
+            print(f"Could not persist job {job.job_id}: {e}")
+
+
+job_manager = JobManager()
+
+registry.gauge(
+    "autoshorts_jobs_queued",
+    "Processing jobs waiting for a worker (queue depth).",
+    callback=lambda: job_manager.count("queued")
+)
+registry.gauge(
+    "autoshorts_jobs_running",
+    "Processing jobs currently running.",
+    callback=lambda: job_manager.count("running")
+)
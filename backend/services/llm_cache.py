@@ -0,0 +1,142 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from services.metrics import LLM_CACHE_REQUESTS
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE", "1") != "0"
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "cache/llm_cache.sqlite3")
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+LLM_CACHE_MAX_MB = float(os.getenv("LLM_CACHE_MAX_MB", "64"))
+# Entries kept in memory in front of SQLite (per process)
+LLM_CACHE_MEMORY_ENTRIES = 256
+
+
+class LLMCache:
+    """
+    Persistent cache of LLM responses keyed by a hash of model name, prompt and
+    generation config.
+    Entries live in one SQLite file (WAL mode), so every uvicorn worker and job
+    process shares them; they expire after a TTL, and the least recently used ones
+    are evicted once the file holds more than max_mb of responses. A small
+    in-process LRU in front answers repeated lookups without touching SQLite.
+    """
+
+    def __init__(self, path: str = LLM_CACHE_PATH, ttl_seconds: float = LLM_CACHE_TTL_SECONDS,
+                 max_mb: float = LLM_CACHE_MAX_MB, enabled: bool = LLM_CACHE_ENABLED):
+        self.path = Path(path)
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.enabled = enabled
+        self._local = threading.local()
+        self._memory = OrderedDict()
+        self._memory_lock = threading.Lock()
+        if self.enabled:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self._connect() as db:
+                db.execute(
+                    "CREATE TABLE IF NOT EXISTS responses ("
+                    "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+                    "created REAL NOT NULL, accessed REAL NOT NULL)"
+                )
+                db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread; SQLite connections must not cross threads
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(str(self.path), timeout=5.0)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    @staticmethod
+    def key(model: str, prompt: str, config: dict = None) -> str:
+        payload = json.dumps({"model": model, "prompt": prompt, "config": config or {}}, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str):
+        """
+        Cached response text, or None on a miss (or an expired entry).
+        """
+        if not self.enabled:
+            return None
+        now = time.time()
+        with self._memory_lock:
+            entry = self._memory.get(key)
+            if entry and entry[0] > now:
+                self._memory.move_to_end(key)
+                LLM_CACHE_REQUESTS.inc(result="hit")
+                return entry[1]
+
+        try:
+            db = self._connect()
+            row = db.execute(
+                "SELECT value, created FROM responses WHERE key = ? AND created > ?",
+                (key, now - self.ttl_seconds)
+            ).fetchone()
+            if row is None:
+                LLM_CACHE_REQUESTS.inc(result="miss")
+                return None
+            with db:
+                db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+        except sqlite3.Error as e:
+            print(f"LLM cache lookup failed: {e}")
+            return None
+
+        self._remember(key, row[0], row[1] + self.ttl_seconds)
+        LLM_CACHE_REQUESTS.inc(result="hit")
+        return row[0]
+
+    def put(self, key: str, value: str):
+        if not self.enabled:
+            return
+        now = time.time()
+        size = len(value.encode("utf-8"))
+        try:
+            db = self._connect()
+            with db:
+                db.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                    (key, value, size, now, now)
+                )
+                db.execute("DELETE FROM responses WHERE created <= ?", (now - self.ttl_seconds,))
+                self._evict(db)
+        except sqlite3.Error as e:
+            print(f"LLM cache store failed: {e}")
+            return
+        self._remember(key, value, now + self.ttl_seconds)
+
+    def _evict(self, db: sqlite3.Connection):
+        """
+        Drops least recently used entries until the cache fits in max_bytes.
+        """
+        total = db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        freed = 0
+        doomed = []
+        for key, size in db.execute("SELECT key, size FROM responses ORDER BY accessed"):
+            if total - freed <= self.max_bytes:
+                break
+            doomed.append((key,))
+            freed += size
+        db.executemany("DELETE FROM responses WHERE key = ?", doomed)
+        with self._memory_lock:
+            for (key,) in doomed:
+                self._memory.pop(key, None)
+
+    def _remember(self, key: str, value: str, expires: float):
+        with self._memory_lock:
+            self._memory[key] = (expires, value)
+            self._memory.move_to_end(key)
+            while len(self._memory) > LLM_CACHE_MEMORY_ENTRIES:
+                self._memory.popitem(last=False)
+
+
+llm_cache = LLMCache()
@@ -0,0 +1,231 @@
+"""
+Minimal Prometheus-style metrics (text exposition format 0.0.4), no external dependency.
+Values are per process; with several uvicorn workers each one reports its own series.
+"""
+
+import asyncio
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# Pipeline stages run from seconds (audio extraction) to tens of minutes (long transcriptions)
+DEFAULT_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1200, 1800, 3600)
+
+
+def _format_labels(label_names: tuple, label_values: tuple, extra: dict = None) -> str:
+    pairs = list(zip(label_names, label_values))
+    if extra:
+        pairs.extend(extra.items())
+    if not pairs:
+        return ""
+    escaped = []
+    for name, value in pairs:
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        escaped.append(f'{name}="{value}"')
+    return "{" + ",".join(escaped) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+class _Metric:
+    metric_type = "untyped"
+
+    def __init__(self, name: str, documentation: str, label_names: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_series(key, value))
+        return lines
+
+    def _render_series(self, key: tuple, value) -> list:
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"]
+
+
+class Counter(_Metric):
+    metric_type = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(_Metric):
+    metric_type = "gauge"
+
+    def __init__(self, name: str, documentation: str, label_names: tuple = (), callback=None):
+        super().__init__(name, documentation, label_names)
+        # Optional callback computes the value at scrape time (unlabelled gauges only)
+        self.callback = callback
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def render(self) -> list:
+        if self.callback:
+            try:
+                self.set(self.callback())
+            except Exception as e:
+                print(f"Metric callback {self.name} failed: {e}")
+        return super().render()
+
+
+class Histogram(_Metric):
+    metric_type = "histogram"
+
+    def __init__(self, name: str, documentation: str, label_names: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                # Per-bucket (non-cumulative) counts + sum + count
+                series = {"buckets": [0] * (len(self.buckets) + 1), "sum": 0.0, "count": 0}
+                self._values[key] = series
+            series["buckets"][bisect.bisect_left(self.buckets, value)] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _render_series(self, key: tuple, series: dict) -> list:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), series["buckets"]):
+            cumulative += count
+            labels = _format_labels(self.label_names, key, {"le": _format_value(bound)})
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(self.label_names, key)
+        lines.append(f"{self.name}_sum{labels} {_format_value(series['sum'])}")
+        lines.append(f"{self.name}_count{labels} {series['count']}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, label_names: tuple = ()) -> Counter:
+        return self.register(Counter(name, documentation, label_names))
+
+    def gauge(self, name: str, documentation: str, label_names: tuple = (), callback=None) -> Gauge:
+        return self.register(Gauge(name, documentation, label_names, callback))
+
+    def histogram(self, name: str, documentation: str, label_names: tuple = (), buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, label_names, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+STAGE_DURATION = registry.histogram(
+    "autoshorts_stage_duration_seconds",
+    "Wall time of pipeline stages (download, trim, extract_audio, transcribe, analyze, cut_video, regenerate).",
+    ("stage",)
+)
+FFMPEG_IN_FLIGHT = registry.gauge(
+    "autoshorts_ffmpeg_processes_in_flight",
+    "FFmpeg subprocesses currently running."
+)
+STT_REQUESTS = registry.counter(
+    "autoshorts_stt_transcriptions_total",
+    "Transcriptions by the STT backend that produced them (openai or faster-whisper fallback).",
+    ("backend",)
+)
+LLM_ERRORS = registry.counter(
+    "autoshorts_llm_errors_total",
+    "Failed Gemini calls.",
+    ("operation",)
+)
+LLM_CACHE_REQUESTS = registry.counter(
+    "autoshorts_llm_cache_requests_total",
+    "LLM response cache lookups by result (hit or miss).",
+    ("result",)
+)
+HEURISTIC_FALLBACKS = registry.counter(
+    "autoshorts_heuristic_fallbacks_total",
+    "Jobs whose moments came from detect_high_energy_moments instead of the LLM."
+)
+EVENT_LOOP_LAG = registry.gauge(
+    "autoshorts_event_loop_lag_seconds",
+    "Most recent delay of the asyncio event loop in waking a periodic timer."
+)
+EVENT_LOOP_LAG_HISTOGRAM = registry.histogram(
+    "autoshorts_event_loop_lag_histogram_seconds",
+    "Distribution of asyncio event loop wake-up delays.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+)
+
+
+def stage_timer(stage: str):
+    """
+    Context manager recording the wall time of a pipeline stage.
+    """
+    return STAGE_DURATION.time(stage=stage)
+
+
+@contextmanager
+def track_ffmpeg():
+    FFMPEG_IN_FLIGHT.inc()
+    try:
+        yield
+    finally:
+        FFMPEG_IN_FLIGHT.dec()
+
+
+async def monitor_event_loop_lag(interval: float = 0.5):
+    """
+    Background task: sleeps for `interval` and records how late the loop woke up.
+    Blocking calls on the event loop show up here as lag.
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(interval)
+        lag = max(0.0, loop.time() - started - interval)
+        EVENT_LOOP_LAG.set(lag)
+        EVENT_LOOP_LAG_HISTOGRAM.observe(lag)
@@ -0,0 +1,67 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+
+class RenderExecutor:
+    """
+    Bounded pool for clip renders.
+    Each task spends its time inside an ffmpeg subprocess, so threads are enough
+    to keep every core busy; the pool size caps how many ffmpeg encoders run at
+    once across all jobs sharing this executor.
+    """
+
+    def __init__(self, max_workers: int = None):
+        self.max_workers = max_workers or int(os.getenv("RENDER_WORKERS", str(os.cpu_count() or 1)))
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="render")
+
+    def submit(self, fn, *args):
+        """
+        Queues a single render (e.g. a clip picked while transcription is still running).
+        """
+        return self.executor.submit(fn, *args)
+
+    def map_ordered(self, fn, items: list, on_result=None) -> list:
+        """
+        Runs fn(index, item) for every item concurrently.
+        Returns results in input order. A task that raises yields None in its slot,
+        so one broken clip does not take down the rest of the batch.
+        on_result(index, result) is called from the worker as soon as a task succeeds.
+        """
+        def run(index, item):
+            result = fn(index, item)
+            if on_result and result is not None:
+                on_result(index, result)
+            return result
+
+        futures = [self.executor.submit(run, i, item) for i, item in enumerate(items)]
+        results = []
+        for i, future in enumerate(futures):
+            try:
+                results.append(future.result())
+            except Exception as e:
+                print(f"Render task {i} failed: {e}")
+                results.append(None)
+        return results
+
+
+def group_close_clips(moments: list, max_gap: float = 30.0) -> list:
+    """
+    Groups moment indices into runs whose clips overlap or sit within max_gap seconds
+    of each other (by start time). Each group can be rendered from a single decode
+    without paying for long stretches of unused video in between.
+    """
+    order = sorted(range(len(moments)), key=lambda i: moments[i]["start"])
+    groups = []
+    group_end = None
+    for i in order:
+        moment = moments[i]
+        if groups and moment["start"] - group_end <= max_gap:
+            groups[-1].append(i)
+            group_end = max(group_end, moment["end"])
+        else:
+            groups.append([i])
+            group_end = moment["end"]
+    return groups
+
+
+render_executor = RenderExecutor()
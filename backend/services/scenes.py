@@ -0,0 +1,112 @@
+import bisect
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from services.video_processing import video_processor
+from services.artifacts import artifact_store
+
+# Analysis resolution and sampling rate: enough to see cuts and movement, cheap to decode
+SCENE_INDEX_WIDTH = 64
+SCENE_INDEX_HEIGHT = 36
+SCENE_INDEX_FPS = float(os.getenv("SCENE_INDEX_FPS", "5"))
+# A frame difference this far above the typical one (and above the floor) is a cut
+SCENE_CUT_FACTOR = 6.0
+SCENE_CUT_FLOOR = 0.12
+SCENE_MIN_SHOT_SECONDS = 0.5
+
+
+class SceneIndex:
+    """
+    Scene-cut timestamps and per-second motion scores (0-1, mean absolute luma change
+    between sampled frames) of one source video.
+    """
+
+    def __init__(self, scene_cuts: list, motion: list, duration: float):
+        self.scene_cuts = scene_cuts
+        self.motion = motion
+        self.duration = duration
+
+    def nearest_cut(self, t: float, max_distance: float = None):
+        """
+        Scene cut closest to t, or None if there is none within max_distance seconds.
+        """
+        i = bisect.bisect_left(self.scene_cuts, t)
+        candidates = [self.scene_cuts[j] for j in (i - 1, i) if 0 <= j < len(self.scene_cuts)]
+        if not candidates:
+            return None
+        nearest = min(candidates, key=lambda cut: abs(cut - t))
+        if max_distance is not None and abs(nearest - t) > max_distance:
+            return None
+        return nearest
+
+    def to_dict(self) -> dict:
+        return {"scene_cuts": self.scene_cuts, "motion": self.motion, "duration": self.duration}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "SceneIndex":
+        return cls(data.get("scene_cuts", []), data.get("motion", []), data.get("duration", 0.0))
+
+
+class SceneIndexer:
+    """
+    Builds scene indexes from one downscaled, decimated decode and caches them
+    per source content (artifact store), so a re-run of the same source never
+    decodes again. Cuts snap clip starts; motion feeds the energy heuristic.
+    """
+
+    def __init__(self):
+        # Indexing runs alongside audio decoding / transcription of the same job
+        self.executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="scenes")
+
+    def submit(self, video_path: str, source_id: str):
+        """
+        Starts get() in the background and returns its Future.
+        """
+        return self.executor.submit(self.get, video_path, source_id)
+
+    def build(self, video_path: str) -> SceneIndex:
+        frames = video_processor.decode_gray_frames(video_path, SCENE_INDEX_WIDTH, SCENE_INDEX_HEIGHT, SCENE_INDEX_FPS)
+        duration = round(len(frames) / SCENE_INDEX_FPS, 3)
+        if len(frames) < 2:
+            return SceneIndex([], [0.0] * int(np.ceil(duration)), duration)
+
+        # Mean absolute difference between consecutive samples, 0-1
+        diffs = np.abs(np.diff(frames.astype(np.int16), axis=0)).mean(axis=(1, 2)) / 255.0
+        threshold = max(SCENE_CUT_FLOOR, float(np.median(diffs)) * SCENE_CUT_FACTOR)
+        scene_cuts = []
+        min_gap = SCENE_MIN_SHOT_SECONDS * SCENE_INDEX_FPS
+        for i in np.flatnonzero(diffs > threshold):
+            # diffs[i] compares samples i and i+1: the new shot starts at sample i+1
+            if scene_cuts and (i + 1) - scene_cuts[-1] < min_gap:
+                continue
+            scene_cuts.append(int(i + 1))
+        cut_set = set(scene_cuts)
+
+        # Cuts are not motion: zero them before averaging per second
+        motion_diffs = np.array([0.0 if (i + 1) in cut_set else d for i, d in enumerate(diffs)])
+        per_second = int(round(SCENE_INDEX_FPS))
+        seconds = int(np.ceil(len(motion_diffs) / per_second))
+        padded = np.zeros(seconds * per_second)
+        padded[:len(motion_diffs)] = motion_diffs
+        motion = padded.reshape(seconds, per_second).mean(axis=1)
+
+        return SceneIndex(
+            [round(cut / SCENE_INDEX_FPS, 3) for cut in scene_cuts],
+            [round(float(m), 4) for m in motion],
+            duration
+        )
+
+    def get(self, video_path: str, source_id: str) -> SceneIndex:
+        """
+        Cached index for a source (built on a miss).
+        """
+        key = artifact_store.key("scenes", source_id, fps=SCENE_INDEX_FPS, size=f"{SCENE_INDEX_WIDTH}x{SCENE_INDEX_HEIGHT}")
+        data = artifact_store.get_json(key)
+        if data:
+            return SceneIndex.from_dict(data)
+        index = self.build(video_path)
+        artifact_store.put_json(key, index.to_dict())
+        return index
+
+
+scene_indexer = SceneIndexer()
@@ -0,0 +1,106 @@
+import bisect
+import os
+
+# Max distance a clip boundary may move to land on a sentence (or at least word) edge
+BOUNDARY_SNAP_SECONDS = float(os.getenv("BOUNDARY_SNAP_SECONDS", "2.0"))
+# Punctuation that closes a sentence (Latin, Devanagari danda, CJK)
+SENTENCE_END_CHARS = (".", "!", "?", "।", "॥", "。", "！", "？")
+# A pause this long also separates sentences (unpunctuated transcripts)
+SENTENCE_PAUSE_SECONDS = 0.7
+
+
+class TranscriptIndex:
+    """
+    Sorted timestamp arrays over one transcript, built once per job:
+    sentence starts/ends and word starts/ends. Lookups are binary searches,
+    so snapping a clip costs O(log n) even on very long transcripts, and the
+    words of a clip are found in O(log n + words in clip) (words_between).
+    Segments without word timings count as a single word.
+    """
+
+    def __init__(self, segments: list):
+        self.words = []
+        for segment in segments:
+            if "words" in segment:
+                self.words.extend(segment["words"])
+            else:
+                self.words.append({"word": segment.get("text", ""), "start": segment["start"], "end": segment["end"]})
+        self.words.sort(key=lambda w: w["start"])
+        self.word_starts = [w["start"] for w in self.words]
+        self.word_ends = sorted(w["end"] for w in self.words)
+        # Running max of word ends in start order: non-decreasing, so it can be bisected
+        # to find the first word that may still overlap a given time
+        self._max_end_prefix = []
+        max_end = float("-inf")
+        for w in self.words:
+            max_end = max(max_end, w["end"])
+            self._max_end_prefix.append(max_end)
+
+        self.sentence_starts = []
+        self.sentence_ends = []
+        previous = None
+        for segment in segments:
+            if previous is None or self._closes_sentence(previous, segment):
+                self.sentence_starts.append(segment["start"])
+                if previous is not None:
+                    self.sentence_ends.append(previous["end"])
+            previous = segment
+        if previous is not None:
+            self.sentence_ends.append(previous["end"])
+        self.sentence_starts.sort()
+        self.sentence_ends.sort()
+
+    @staticmethod
+    def _closes_sentence(previous: dict, segment: dict) -> bool:
+        text = previous.get("text", "").strip()
+        return text.endswith(SENTENCE_END_CHARS) or segment["start"] - previous["end"] >= SENTENCE_PAUSE_SECONDS
+
+    @staticmethod
+    def _nearest(values: list, t: float, tolerance: float):
+        i = bisect.bisect_left(values, t)
+        candidates = [values[j] for j in (i - 1, i) if 0 <= j < len(values)]
+        if not candidates:
+            return None
+        nearest = min(candidates, key=lambda v: abs(v - t))
+        return nearest if abs(nearest - t) <= tolerance else None
+
+    def words_between(self, start: float, end: float = None) -> list:
+        """
+        Words overlapping [start, end] (end=None: to the end of the transcript), in order.
+        """
+        first = bisect.bisect_right(self._max_end_prefix, start)
+        last = len(self.words) if end is None else bisect.bisect_left(self.word_starts, end)
+        return [w for w in self.words[first:last] if w["end"] > start]
+
+    def inside_word(self, t: float) -> bool:
+        """
+        True if t falls strictly inside a spoken word.
+        """
+        i = bisect.bisect_right(self.word_starts, t) - 1
+        return i >= 0 and self.words[i]["start"] < t < self.words[i]["end"]
+
+    def snap_start(self, t: float, tolerance: float = BOUNDARY_SNAP_SECONDS) -> float:
+        snapped = self._nearest(self.sentence_starts, t, tolerance)
+        if snapped is None:
+            snapped = self._nearest(self.word_starts, t, tolerance)
+        return t if snapped is None else snapped
+
+    def snap_end(self, t: float, tolerance: float = BOUNDARY_SNAP_SECONDS) -> float:
+        snapped = self._nearest(self.sentence_ends, t, tolerance)
+        if snapped is None:
+            snapped = self._nearest(self.word_ends, t, tolerance)
+        return t if snapped is None else snapped
+
+    def snap_moment(self, moment: dict, tolerance: float = BOUNDARY_SNAP_SECONDS) -> dict:
+        """
+        Moves start/end (in place) to the nearest sentence edge within tolerance,
+        else the nearest word edge, else leaves them. Returns the moment.
+        """
+        start = self.snap_start(moment["start"], tolerance)
+        end = self.snap_end(moment["end"], tolerance)
+        # Never let snapping collapse a clip
+        if end - start < (moment["end"] - moment["start"]) / 2:
+            return moment
+        moment["start"] = round(start, 3)
+        moment["end"] = round(end, 3)
+        return moment
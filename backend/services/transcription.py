@@ -1,7 +1,17 @@
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
-import openai
+import asyncio
+import multiprocessing
 import os
+import queue
+import tempfile
+import threading
 from dotenv import load_dotenv
+from services.metrics import STT_REQUESTS, registry
+from services.cpu_budget import cpu_governor
+from services.ai_clients import ai_clients, STT_HEDGE_SECONDS
+from services.audio import is_pcm, load_pcm, plan_chunks, SAMPLE_RATE
 
 load_dotenv()
 
@@ -16,118 +26,449 @@ if not os.getenv("RENDER"):
         FASTER_WHISPER_AVAILABLE = False
         print("faster-whisper not available. Using OpenAI API only for transcription.")
 
+# 'tiny' is fast and small. 'base' is better but larger.
+# Using 'int8' quantization for speed on CPU.
+LOCAL_MODEL_SIZE = os.getenv("WHISPER_MODEL_SIZE", "tiny")
+LOCAL_COMPUTE_TYPE = os.getenv("WHISPER_COMPUTE_TYPE", "int8")
+# CTranslate2 threading per model: 0 splits the CPU budget (CPU_BUDGET) between the
+# pool's instances; num_workers > 1 lets one model run that many transcriptions concurrently
+WHISPER_CPU_THREADS = int(os.getenv("WHISPER_CPU_THREADS", "0"))
+WHISPER_NUM_WORKERS = int(os.getenv("WHISPER_NUM_WORKERS", "1"))
+# Model instances kept per (size, compute_type)
+WHISPER_POOL_SIZE = int(os.getenv("WHISPER_POOL_SIZE", "1"))
+# Load the default model at startup instead of on the first request
+WHISPER_PRELOAD = os.getenv("WHISPER_PRELOAD", "0") == "1"
+
+# Chunked local mode: long PCM audio is split at silences and the chunks are
+# transcribed in parallel worker processes. 1 worker disables it.
+TRANSCRIBE_WORKERS = int(os.getenv("TRANSCRIBE_WORKERS", str(max(1, (os.cpu_count() or 1) // 2))))
+TRANSCRIBE_CHUNK_SECONDS = float(os.getenv("TRANSCRIBE_CHUNK_SECONDS", "180"))
+
+
+class WhisperModelPool:
+    """
+    Warm faster-whisper models keyed by (size, compute_type), up to `instances` of each.
+    acquire() hands out an idle model, loads another one while under the limit, and
+    otherwise blocks until a transcription returns one, so concurrent jobs never share
+    a model beyond what its num_workers allows.
+    """
+
+    def __init__(self, instances: int = WHISPER_POOL_SIZE, cpu_threads: int = WHISPER_CPU_THREADS,
+                 num_workers: int = WHISPER_NUM_WORKERS):
+        self.instances = max(1, instances)
+        self.cpu_threads = cpu_threads or cpu_governor.share(self.instances)
+        self.num_workers = max(1, num_workers)
+        self._idle = {}
+        self._loaded = {}
+        self._lock = threading.Lock()
+        # Set once the default model is loaded (readiness probe)
+        self.ready = threading.Event()
+
+    def _load(self, size: str, compute_type: str):
+        print(f"Loading local Whisper model ({size}, {compute_type})... This may take a moment.")
+        model = WhisperModel(
+            size, device="cpu", compute_type=compute_type,
+            cpu_threads=self.cpu_threads, num_workers=self.num_workers
+        )
+        if (size, compute_type) == (LOCAL_MODEL_SIZE, LOCAL_COMPUTE_TYPE):
+            self.ready.set()
+        return model
+
+    @contextmanager
+    def acquire(self, size: str = None, compute_type: str = None):
+        key = (size or LOCAL_MODEL_SIZE, compute_type or LOCAL_COMPUTE_TYPE)
+        with self._lock:
+            idle = self._idle.setdefault(key, queue.Queue())
+            reserve = idle.empty() and self._loaded.get(key, 0) < self.instances
+            if reserve:
+                self._loaded[key] = self._loaded.get(key, 0) + 1
+
+        if reserve:
+            try:
+                model = self._load(*key)
+            except Exception:
+                with self._lock:
+                    self._loaded[key] -= 1
+                raise
+        else:
+            model = idle.get()
+
+        try:
+            # Counted against the CPU budget so concurrent encodes get fewer threads
+            with cpu_governor.lease(threads=self.cpu_threads):
+                yield model
+        finally:
+            idle.put(model)
+
+    def preload(self, size: str = None, compute_type: str = None):
+        """
+        Loads every instance of a model up front so no request pays for it.
+        """
+        key = (size or LOCAL_MODEL_SIZE, compute_type or LOCAL_COMPUTE_TYPE)
+        while True:
+            with self._lock:
+                idle = self._idle.setdefault(key, queue.Queue())
+                if self._loaded.get(key, 0) >= self.instances:
+                    break
+                self._loaded[key] = self._loaded.get(key, 0) + 1
+            try:
+                idle.put(self._load(*key))
+            except Exception:
+                with self._lock:
+                    self._loaded[key] -= 1
+                raise
+
+    def loaded_count(self) -> int:
+        with self._lock:
+            return sum(self._loaded.values())
+
+
+model_pool = WhisperModelPool()
+
+registry.gauge(
+    "autoshorts_whisper_models_loaded",
+    "faster-whisper model instances loaded in this process.",
+    callback=model_pool.loaded_count
+)
+
+
+def _format_segment(segment, offset: float = 0.0) -> dict:
+    """
+    faster-whisper Segment -> OpenAI-style {start, end, text, words: [{word, start, end}]},
+    shifted by offset seconds (chunk position in the full audio).
+    """
+    seg_words = []
+    if segment.words:
+        for w in segment.words:
+            seg_words.append({
+                "word": w.word,
+                "start": w.start + offset,
+                "end": w.end + offset
+            })
+    return {
+        "start": segment.start + offset,
+        "end": segment.end + offset,
+        "text": segment.text,
+        "words": seg_words
+    }
+
+
+# Per worker process: the model is loaded by the first chunk and reused after that
+_worker_model = None
+
+
+def _load_worker_model(cpu_threads: int):
+    global _worker_model
+    if _worker_model is None:
+        _worker_model = WhisperModel(
+            LOCAL_MODEL_SIZE, device="cpu", compute_type=LOCAL_COMPUTE_TYPE,
+            cpu_threads=WHISPER_CPU_THREADS or cpu_threads
+        )
+    return _worker_model
+
+
+def _detect_language_worker(pcm_path: str, cpu_threads: int) -> str:
+    model = _load_worker_model(cpu_threads)
+    # Whisper detects from the first 30 s window
+    language, probability, _ = model.detect_language(load_pcm(pcm_path)[:30 * SAMPLE_RATE])
+    print(f"   Detected language '{language}' with probability {probability}")
+    return language
+
+
+def _transcribe_chunk_worker(pcm_path: str, start: float, end: float, cpu_threads: int, transcribe_kwargs: dict) -> dict:
+    """
+    Runs in a worker process: transcribes [start, end) of the PCM file (a view of the
+    memory map, nothing is copied across processes) and returns absolute timestamps.
+    """
+    model = _load_worker_model(cpu_threads)
+    audio = load_pcm(pcm_path)[int(start * SAMPLE_RATE):int(end * SAMPLE_RATE)]
+    segments, info = model.transcribe(audio, **transcribe_kwargs)
+    return {
+        "segments": [_format_segment(segment, offset=start) for segment in segments],
+        "language": info.language
+    }
+
+
+class TranscriptionStream:
+    """
+    Segments of one transcription, in time order, produced lazily while iterating.
+    detected_language and duration are filled in once decoding starts. result()
+    drains whatever is left and returns the usual transcript dict.
+    """
+
+    def __init__(self, segments, backend: str, detected_language: str = None, duration: float = None, result: dict = None):
+        self._segments = iter(segments)
+        self.backend = backend
+        self.detected_language = detected_language
+        self.duration = duration
+        # Segments yielded so far
+        self.segments = []
+        # Complete response of a non-streaming backend, returned untouched by result()
+        self._result = result
+
+    def __iter__(self):
+        for segment in self._segments:
+            self.segments.append(segment)
+            yield segment
+
+    def result(self) -> dict:
+        for _ in self:
+            pass
+        if self._result is not None:
+            return self._result
+        return {
+            "text": " ".join(segment["text"] for segment in self.segments),
+            "segments": self.segments,
+            "detected_language": self.detected_language,
+            "backend": self.backend
+        }
+
 
 class Transcriber:
     def __init__(self):
-        self.api_key = os.getenv("OPENAI_API_KEY")
-        self.client = openai.OpenAI(api_key=self.api_key) if self.api_key else None
-        
-        # Lazy load local model only if needed (or if user wants free mode)
-        self.local_model = None
+        # Worker processes for chunked local transcription, started on first use
+        self.chunk_pool = None
+        # Set until the startup preload finishes (or fails); gates /ready
+        self._preload_pending = WHISPER_PRELOAD
+        self._pool_lock = threading.Lock()
 
-    def _get_local_model(self):
+    def _check_local_available(self):
         # Prevent local model loading on Render to save memory
         if os.getenv("RENDER"):
              raise RuntimeError("Local Whisper model is disabled on Render to prevent memory crashes. Please set OPENAI_API_KEY.")
 
         if not FASTER_WHISPER_AVAILABLE:
             raise RuntimeError("faster-whisper is not installed. Please use OpenAI API or install faster-whisper locally.")
-        if not self.local_model:
-            print("Loading local Whisper model (tiny)... This may take a moment.")
-            # 'tiny' is fast and small. 'base' is better but larger.
-            # Using 'int8' quantization for speed on CPU.
-            self.local_model = WhisperModel("tiny", device="cpu", compute_type="int8")
-        return self.local_model
 
+    @property
+    def client(self):
+        """
+        The speech-to-text API provider (see services/ai_clients.py), or None without one.
+        """
+        return ai_clients.stt if ai_clients.stt.available else None
+
+    @property
+    def needs_local_model(self) -> bool:
+        return not self.client and FASTER_WHISPER_AVAILABLE
 
-    def transcribe_audio(self, audio_path: str, language: str = None) -> dict:
+    @property
+    def is_ready(self) -> bool:
+        """
+        False while a startup preload (WHISPER_PRELOAD=1) of the local model is still
+        running. Without preload the first transcription loads the model itself, so
+        there is nothing to wait for; a failed preload also stops blocking readiness.
+        """
+        return not (self._preload_pending and self.needs_local_model)
+
+    def preload_models(self):
+        """
+        Warms the in-process model pool and, for chunked mode, the worker processes.
+        Blocking; run it off the event loop.
+        """
+        try:
+            if not self.needs_local_model:
+                return
+            model_pool.preload()
+            if TRANSCRIBE_WORKERS > 1:
+                pool = self._get_chunk_pool()
+                cpu_threads = cpu_governor.share(TRANSCRIBE_WORKERS)
+                # Best effort: idle workers pick these up, so usually each loads its model once
+                warmups = [pool.submit(_load_worker_model, cpu_threads) for _ in range(TRANSCRIBE_WORKERS)]
+                for future in warmups:
+                    future.result()
+            print("Local Whisper models are warm.")
+        finally:
+            self._preload_pending = False
+
+    def _get_chunk_pool(self) -> ProcessPoolExecutor:
+        with self._pool_lock:
+            if not self.chunk_pool:
+                # spawn: CTranslate2 thread pools do not survive a fork
+                self.chunk_pool = ProcessPoolExecutor(
+                    max_workers=TRANSCRIBE_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self.chunk_pool
+
+    @property
+    def backend_name(self) -> str:
+        """
+        The STT backend a transcription is expected to use ("openai" or "faster-whisper").
+        Part of the artifact cache key for transcripts.
+        """
+        return self.client.name if self.client else "faster-whisper"
+
+
+    def transcribe_audio(self, audio_path: str, language: str = None, progress_callback=None) -> dict:
         """
         Transcribes audio using OpenAI Whisper API or Local Whisper (Fallback).
+        audio_path is normally decoded PCM (VideoProcessor.decode_audio), which local Whisper
+        reads straight from the memory map; any container FFmpeg understands also works.
         Returns the full response object with segments (OpenAI format or similar dict).
+        progress_callback: Optional. Called with the transcribed fraction (0.0-1.0) as local
+        segments decode. The OpenAI API gives no intermediate progress.
+        """
+        try:
+            stream = self.stream_transcription(audio_path, language)
+            for segment in stream:
+                if progress_callback and stream.duration:
+                    progress_callback(min(1.0, segment["end"] / stream.duration))
+            return stream.result()
+        except Exception as e:
+            print(f"Local Transcription error: {e}")
+            raise
+
+    def stream_transcription(self, audio_path: str, language: str = None) -> "TranscriptionStream":
+        """
+        Like transcribe_audio, but returns a TranscriptionStream that yields segments
+        ({start, end, text, words}) in time order as local Whisper decodes them, so
+        analysis can work on the start of the audio while the rest is still running.
+        The OpenAI API returns everything at once; its stream is already complete.
         """
         if self.client:
             print("Using OpenAI Whisper API...")
-            audio_file = open(audio_path, "rb")
+            # Local Whisper is hedged against the API: it starts once the API has taken
+            # STT_HEDGE_SECONDS (or failed), and whichever finishes first is used
+            fallback = None
+            if FASTER_WHISPER_AVAILABLE and not os.getenv("RENDER"):
+                fallback = lambda cancelled: self._local_fallback(audio_path, language, cancelled)
             try:
-                # Prepare arguments
-                kwargs = {
-                    "model": "whisper-1",
-                    "file": audio_file,
-                    "response_format": "verbose_json",
-                    "timestamp_granularities": ["segment", "word"]
-                }
-                # Force task to transcribe to prevent translation
-                # Only add language if provided, otherwise auto-detect but keep task=transcribe
-                if language:
-                    kwargs["language"] = language
-                elif language is not None:
-                     # Explicitly allowed to be None for auto
-                     pass
-                
-                # OpenAI API doesn't strictly need 'task' param for transcription as it is default, 
-                # but explicit is better. However, creating translations is a different endpoint usually 
-                # or different param. For chat completions it's different.
-                # checking docs: yes, transcriptions.create is for transcription. translations.create is for translation.
-                # So we are good on OpenAI side just by using the correct method. 
-                # but let's be safe.
-                
-                transcript = self.client.audio.transcriptions.create(**kwargs)
-                return transcript
+                stream, source = ai_clients.run(ai_clients.hedge(
+                    self._api_transcribe(audio_path, language), fallback, STT_HEDGE_SECONDS
+                ))
+                if source == "fallback":
+                    print("Local Whisper finished before the API; using its transcript.")
+                return stream
             except Exception as e:
                 print(f"OpenAI Transcription error: {e}")
+                if fallback:
+                    raise
                 print("Falling back to local model...")
-                # Allow fallback if API fails
-            finally:
-                audio_file.close()
 
         # Fallback / Free Mode
+        print("Using Local Whisper (faster-whisper)...")
+        return self._local_stream(audio_path, language)
+
+    async def _api_transcribe(self, audio_path: str, language: str = None) -> "TranscriptionStream":
+        # The API needs a compressed upload; only this path pays for an encode
+        upload_path = await asyncio.to_thread(self._upload_file, audio_path)
         try:
-            print("Using Local Whisper (faster-whisper)...")
-            model = self._get_local_model()
-            
-            # Prepare arguments
-            # faster-whisper defaults to 'transcribe'. 
-            # If we want to be safe, we can add task="transcribe"
-            transcribe_kwargs = {"word_timestamps": True, "task": "transcribe"}
-            if language:
-                transcribe_kwargs["language"] = language
-                
-            segments, info = model.transcribe(audio_path, **transcribe_kwargs)
-            
+            result = await ai_clients.transcribe(upload_path, language)
+        finally:
+            if upload_path != audio_path:
+                Path(upload_path).unlink(missing_ok=True)
+        result["backend"] = self.backend_name
+        STT_REQUESTS.inc(backend=self.backend_name)
+        return TranscriptionStream(
+            result.get("segments") or [], self.backend_name,
+            detected_language=result.get("language"),
+            duration=result.get("duration"),
+            result=result
+        )
+
+    def _local_fallback(self, audio_path: str, language: str, cancelled) -> "TranscriptionStream":
+        """
+        Runs local Whisper to completion for hedge(); gives up (None) between segments
+        once the API has won.
+        """
+        stream = self._local_stream(audio_path, language)
+        segments = stream._segments
+        try:
+            for _ in stream:
+                if cancelled.is_set():
+                    return None
+        finally:
+            # Releases the pooled model / cancels outstanding chunks right away
+            segments.close()
+        return TranscriptionStream(
+            stream.segments, stream.backend,
+            detected_language=stream.detected_language,
+            duration=stream.duration
+        )
+
+    def _local_stream(self, audio_path: str, language: str = None) -> "TranscriptionStream":
+        self._check_local_available()
+
+        # Prepare arguments
+        # faster-whisper defaults to 'transcribe'. 
+        # If we want to be safe, we can add task="transcribe"
+        transcribe_kwargs = {"word_timestamps": True, "task": "transcribe"}
+        if language:
+            transcribe_kwargs["language"] = language
+
+        stream = TranscriptionStream([], "faster-whisper")
+        if is_pcm(audio_path) and TRANSCRIBE_WORKERS > 1:
+            chunks = plan_chunks(load_pcm(audio_path), TRANSCRIBE_CHUNK_SECONDS)
+            if len(chunks) > 1:
+                stream.duration = chunks[-1][1]
+                stream._segments = self._chunked_segments(audio_path, chunks, transcribe_kwargs, stream)
+                return stream
+        stream._segments = self._local_segments(audio_path, transcribe_kwargs, stream)
+        return stream
+
+    def _local_segments(self, audio_path: str, transcribe_kwargs: dict, stream: "TranscriptionStream"):
+        # Segments decode lazily, so the model stays checked out until the stream is drained
+        with model_pool.acquire() as model:
+            # 16 kHz mono float32 is exactly what faster-whisper decodes to internally
+            audio_input = load_pcm(audio_path) if is_pcm(audio_path) else audio_path
+            segments, info = model.transcribe(audio_input, **transcribe_kwargs)
+
             print(f"   Detected language '{info.language}' with probability {info.language_probability}")
+            stream.detected_language = info.language
+            stream.duration = info.duration
 
-            # Convert generator to list and format like OpenAI response
+            # Format like OpenAI response
             # OpenAI segment: {start, end, text, words: [{word, start, end}]}
-            formatted_segments = []
-            full_text = []
-
             for segment in segments:
                 # print(f"   Segment: {segment.text}") # Debug print (Disabled to prevent Unicode errors on Windows console)
-                seg_words = []
-                if segment.words:
-                    for w in segment.words:
-                        seg_words.append({
-                            "word": w.word,
-                            "start": w.start,
-                            "end": w.end
-                        })
-                
-                formatted_segments.append({
-                    "start": segment.start,
-                    "end": segment.end,
-                    "text": segment.text,
-                    "words": seg_words
-                })
-                full_text.append(segment.text)
-
-            return {
-                "text": " ".join(full_text),
-                "segments": formatted_segments,
-                "detected_language": info.language
-            }
+                yield _format_segment(segment)
+        STT_REQUESTS.inc(backend="faster-whisper")
 
-        except Exception as e:
-            print(f"Local Transcription error: {e}")
+    def _chunked_segments(self, pcm_path: str, chunks: list, transcribe_kwargs: dict, stream: "TranscriptionStream"):
+        """
+        Transcribes silence-aligned chunks of a PCM file in parallel worker processes and
+        yields their segments in order with absolute timestamps.
+        """
+        pool = self._get_chunk_pool()
+        cpu_threads = cpu_governor.share(TRANSCRIBE_WORKERS)
+        print(f"   Chunked transcription: {len(chunks)} chunks on {TRANSCRIBE_WORKERS} workers")
+        # The worker processes' threads count against the CPU budget while they run
+        with cpu_governor.lease(threads=(WHISPER_CPU_THREADS or cpu_threads) * TRANSCRIBE_WORKERS):
+            # Chunks detecting languages independently could disagree; settle it once up front
+            language = transcribe_kwargs.get("language")
+            if not language:
+                language = pool.submit(_detect_language_worker, pcm_path, cpu_threads).result()
+                transcribe_kwargs = dict(transcribe_kwargs, language=language)
+            stream.detected_language = language
+
+            futures = [
+                pool.submit(_transcribe_chunk_worker, pcm_path, start, end, cpu_threads, transcribe_kwargs)
+                for start, end in chunks
+            ]
+            try:
+                for future in futures:
+                    yield from future.result()["segments"]
+            finally:
+                # Stream abandoned or a chunk failed: do not keep decoding the rest
+                for future in futures:
+                    future.cancel()
+        STT_REQUESTS.inc(backend="faster-whisper")
+
+    def _upload_file(self, audio_path: str) -> str:
+        """
+        Returns a file the OpenAI API accepts: decoded PCM is encoded to a temporary MP3.
+        The MP3 gets a unique name in the temp dir (the PCM is a shared cache artifact,
+        so concurrent jobs on one source must not write the same file); the caller deletes it.
+        """
+        if not is_pcm(audio_path):
+            return audio_path
+        from services.video_processing import video_processor
+        fd, upload_path = tempfile.mkstemp(prefix=f"{Path(audio_path).stem}_", suffix=".upload.mp3")
+        os.close(fd)
+        try:
+            return video_processor.encode_pcm_for_upload(audio_path, upload_path)
+        except Exception:
+            Path(upload_path).unlink(missing_ok=True)
             raise
 
     def transcribe_with_roman_telugu(self, audio_path: str, language: str = None) -> dict:
@@ -140,21 +481,10 @@ class Transcriber:
         # Check if Telugu was detected or specified
         detected_lang = result.get("detected_language", language)
         if detected_lang == "te" or language == "te":
-            from services.transliteration import transliterate_telugu_to_roman, process_transcript_for_roman_telugu
-            
-            # Convert full text
-            if "text" in result:
-                result["text"] = transliterate_telugu_to_roman(result["text"])
-            
-            # Convert segments
-            if "segments" in result:
-                for segment in result["segments"]:
-                    if "text" in segment:
-                        segment["text"] = transliterate_telugu_to_roman(segment["text"])
-                    if "words" in segment:
-                        for word in segment["words"]:
-                            if "word" in word:
-                                word["word"] = transliterate_telugu_to_roman(word["word"])
+            from services.transliteration import telugu_transliterator
+
+            # Full text, segments and words in one pass; repeated words come from the cache
+            telugu_transliterator.transliterate_transcript(result)
             
             result["roman_telugu"] = True
         
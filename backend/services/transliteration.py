@@ -4,7 +4,9 @@ Converts Telugu script to English letters with phonetic pronunciation
 Used for Instagram Reels & YouTube Shorts style captions
 """
 
+import os
 import re
+from functools import lru_cache
 
 # Telugu vowels and their Roman equivalents
 VOWELS = {
@@ -28,7 +30,7 @@ CONSONANTS = {
     'త': 'tha', 'థ': 'tha', 'ద': 'da', 'ధ': 'dha', 'న': 'na',
     'ప': 'pa', 'ఫ': 'pha', 'బ': 'ba', 'భ': 'bha', 'మ': 'ma',
     'య': 'ya', 'ర': 'ra', 'ల': 'la', 'వ': 'va', 'శ': 'sha',
-    'ష': 'sha', 'స': 'sa', 'హ': 'ha', 'ళ': 'la', 'క్ష': 'ksha',
+    'ష': 'sha', 'స': 'sa', 'హ': 'ha', 'ళ': 'la',
     'ఱ': 'rra', 'ం': 'n', 'ః': 'h', 'ఁ': 'n'
 }
 
@@ -71,70 +73,120 @@ COMMON_WORDS = {
 }
 
 
+# Consonant clusters romanized as a unit (longest match wins over the letters)
+CONJUNCTS = {
+    'క్ష': 'ksha',
+}
+
+# Words transliterated per Transliterator, remembered across calls
+WORD_CACHE_SIZE = int(os.getenv("TRANSLITERATION_CACHE_SIZE", "20000"))
+
+_END = ""
+
+
+def _trie_pattern(node: dict) -> str:
+    """
+    Regex for a trie node's subtree. Children are distinct characters, so at most one
+    branch can match, and greedy optional tails make the regex take the longest key.
+    """
+    branches = []
+    leaves = []
+    for char in sorted(key for key in node if key != _END):
+        child = node[char]
+        if set(child) == {_END}:
+            leaves.append(re.escape(char))
+            continue
+        tail = _trie_pattern(child)
+        branches.append(re.escape(char) + (f"(?:{tail})?" if _END in child else f"(?:{tail})"))
+    if leaves:
+        branches.append(leaves[0] if len(leaves) == 1 else "[" + "".join(leaves) + "]")
+    return "|".join(branches)
+
+
+class Transliterator:
+    """
+    Table-driven romanizer for one Indic script.
+    The tables are expanded once into token -> Roman (every consonant and conjunct
+    with each vowel mark and the virama, plus independent vowels and marks), and
+    the tokens are compiled as a trie into a single regex, so a word is split by
+    longest match in C and joined from a dict. Words are memoized in an LRU cache;
+    a transcript repeats most of its words, so few ever reach the regex.
+    Adding Hindi or Tamil is a matter of their tables and Unicode block.
+    """
+
+    def __init__(self, vowels: dict, vowel_marks: dict, consonants: dict, conjuncts: dict = None,
+                 common_words: dict = None, block: tuple = ('\u0C00', '\u0C7F'), cache_size: int = WORD_CACHE_SIZE):
+        self.common_words = common_words or {}
+        self.tokens = self._expand(vowels, vowel_marks, {**consonants, **(conjuncts or {})})
+        trie = {}
+        for token in self.tokens:
+            node = trie
+            for char in token:
+                node = node.setdefault(char, {})
+            node[_END] = {}
+        # Anything not in the tables passes through one character at a time
+        self._token_re = re.compile(f"(?:{_trie_pattern(trie)})|.", re.DOTALL)
+        self._script_re = re.compile(f"[{block[0]}-{block[1]}]")
+        self.word = lru_cache(maxsize=cache_size)(self._transliterate_word)
+
+    @staticmethod
+    def _expand(vowels: dict, vowel_marks: dict, consonants: dict) -> dict:
+        tokens = dict(vowels)
+        for mark, roman in vowel_marks.items():
+            tokens.setdefault(mark, roman)
+        for consonant, base in consonants.items():
+            tokens[consonant] = base
+            for mark, roman in vowel_marks.items():
+                # The mark replaces the inherent 'a'; the virama drops it
+                tokens[consonant + mark] = base[:-1] + roman
+        return tokens
+
+    def _transliterate_word(self, word: str) -> str:
+        # Check common words first, also without trailing punctuation
+        common = self.common_words.get(word) or self.common_words.get(word.rstrip('?!.,'))
+        if common:
+            return common
+        get = self.tokens.get
+        return "".join([get(token, token) for token in self._token_re.findall(word)])
+
+    def transliterate(self, text: str) -> str:
+        if not text:
+            return ""
+        if not self._script_re.search(text):
+            return text  # Not in this script, return as-is
+        return " ".join(map(self.word, text.split()))
+
+    def transliterate_transcript(self, result: dict) -> dict:
+        """
+        Romanizes a transcript dict in place in one walk: full text, segment texts
+        and word timings. They repeat the same words, which the word cache serves.
+        """
+        transliterate = self.transliterate
+        if "text" in result:
+            result["text"] = transliterate(result["text"])
+        for segment in result.get("segments") or []:
+            if "text" in segment:
+                segment["text"] = transliterate(segment["text"])
+            for word in segment.get("words") or []:
+                if "word" in word:
+                    word["word"] = transliterate(word["word"])
+        return result
+
+
+telugu_transliterator = Transliterator(VOWELS, VOWEL_MARKS, CONSONANTS, CONJUNCTS, COMMON_WORDS)
+
+# Language code -> Transliterator, for the languages that have tables
+TRANSLITERATORS = {
+    "te": telugu_transliterator,
+}
+
+
 def transliterate_telugu_to_roman(text: str) -> str:
     """
     Convert Telugu script to Roman Telugu (English letters).
     Preserves the phonetic pronunciation for Instagram/YouTube style captions.
     """
-    if not text:
-        return ""
-    
-    # Check if text contains Telugu characters
-    if not any('\u0C00' <= char <= '\u0C7F' for char in text):
-        return text  # Not Telugu, return as-is
-    
-    result = []
-    words = text.split()
-    
-    for word in words:
-        # Check common words first
-        if word in COMMON_WORDS:
-            result.append(COMMON_WORDS[word])
-            continue
-        
-        # Check word without trailing punctuation
-        word_clean = word.rstrip('?!.,')
-        if word_clean in COMMON_WORDS:
-            result.append(COMMON_WORDS[word_clean])
-            continue
-        
-        # Transliterate character by character
-        roman_word = ""
-        i = 0
-        while i < len(word):
-            char = word[i]
-            
-            # Check if it's a Telugu character
-            if '\u0C00' <= char <= '\u0C7F':
-                # Check for vowel
-                if char in VOWELS:
-                    roman_word += VOWELS[char]
-                # Check for consonant
-                elif char in CONSONANTS:
-                    base = CONSONANTS[char]
-                    # Check for following vowel mark
-                    if i + 1 < len(word) and word[i + 1] in VOWEL_MARKS:
-                        mark = VOWEL_MARKS[word[i + 1]]
-                        if mark:  # Not virama
-                            roman_word += base[:-1] + mark  # Replace 'a' with vowel mark
-                        else:  # Virama - no vowel
-                            roman_word += base[:-1]
-                        i += 1
-                    else:
-                        roman_word += base
-                # Check for other marks
-                elif char in VOWEL_MARKS:
-                    roman_word += VOWEL_MARKS[char]
-                else:
-                    roman_word += char  # Keep as-is if unknown
-            else:
-                roman_word += char  # Non-Telugu character
-            
-            i += 1
-        
-        result.append(roman_word)
-    
-    return ' '.join(result)
+    return telugu_transliterator.transliterate(text)
 
 
 def process_transcript_for_roman_telugu(segments: list) -> list:
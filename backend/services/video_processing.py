@@ -1,7 +1,13 @@
 import subprocess
 import os
+import re
 import shutil
+import tempfile
 from pathlib import Path
+from services.metrics import track_ffmpeg, FFMPEG_IN_FLIGHT
+from services.cpu_budget import cpu_governor
+from services.audio import SAMPLE_RATE, PCM_SUFFIX
+from services.transcript_index import TranscriptIndex
 
 
 # Define available caption styles
@@ -15,6 +21,111 @@ STYLE_MAP = {
     "Classic": "Alignment=10,Fontname=Nirmala UI,Fontsize=30,PrimaryColour=&HFFFFFF&,OutlineColour=&H000000&,BorderStyle=1,Outline=1,Shadow=0,MarginV=20"
 }
 
+class AudioTap:
+    """
+    Streaming audio extraction: download code feeds the container bytes with write()
+    as they arrive and FFmpeg demuxes the audio on the fly, so the audio file is
+    ready the moment the download ends instead of after a separate extract pass.
+    Best effort: inputs FFmpeg cannot read from a pipe (e.g. MP4 with the moov atom
+    at the end) just make close() raise, and the caller falls back to decode_audio.
+    A failing tap never interrupts the download itself.
+    """
+
+    def __init__(self, command: list, output_path: str):
+        self.output_path = output_path
+        self.failed = False
+        self._stderr = tempfile.TemporaryFile()
+        self._finished = False
+        FFMPEG_IN_FLIGHT.inc()
+        self.process = subprocess.Popen(
+            command, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=self._stderr
+        )
+
+    def write(self, chunk: bytes):
+        if self.failed:
+            return
+        try:
+            self.process.stdin.write(chunk)
+        except (BrokenPipeError, OSError):
+            # FFmpeg gave up on the stream; keep downloading, extract later
+            self.failed = True
+
+    def close(self) -> str:
+        """
+        Ends the input and waits for FFmpeg. Returns the audio path, or raises if the tap failed.
+        """
+        try:
+            try:
+                self.process.stdin.close()
+            except (BrokenPipeError, OSError):
+                self.failed = True
+            returncode = self.process.wait()
+            self._stderr.seek(0)
+            log = self._stderr.read().decode("utf-8", errors="replace")
+            # A non-seekable MP4 with a trailing moov atom exits 0 but encodes nothing
+            empty = "Output file is empty" in log
+            if returncode != 0 or self.failed or empty or not Path(self.output_path).exists():
+                raise RuntimeError(f"Audio tap failed (exit {returncode}): {log[-500:]}")
+            return self.output_path
+        finally:
+            self._finish()
+
+    def abort(self):
+        """
+        Kills FFmpeg without waiting for the rest of the stream (download failed).
+        """
+        if self._finished:
+            return
+        self.failed = True
+        try:
+            self.process.kill()
+            self.process.wait()
+        finally:
+            self._finish()
+
+    def _finish(self):
+        if not self._finished:
+            self._finished = True
+            self._stderr.close()
+            FFMPEG_IN_FLIGHT.dec()
+
+
+# Encoder settings, per deployment. Final renders default to libx264's own defaults.
+X264_PRESET = os.getenv("X264_PRESET", "medium")
+X264_CRF = os.getenv("X264_CRF", "23")
+PREVIEW_X264_PRESET = os.getenv("PREVIEW_X264_PRESET", "ultrafast")
+PREVIEW_X264_CRF = os.getenv("PREVIEW_X264_CRF", "30")
+# Trimmed sources only feed analysis and clip cutting
+TRIM_X264_PRESET = os.getenv("TRIM_X264_PRESET", "fast")
+
+# Render quality profiles. "final" is the full-quality short;
+# "preview" is a quarter-size proxy for quick style iterations, encoded as cheaply
+# as possible. Captions scale with the frame, so a preview looks like the final.
+# "mezzanine" encodes the caption-free cropped clip that restyles burn onto: near
+# lossless, so the second generation is indistinguishable from a direct render.
+QUALITY_PROFILES = {
+    "final": {"width": 1080, "height": 1920, "encode": ["-preset", X264_PRESET, "-crf", X264_CRF],
+              "mezzanine": ["-preset", "veryfast", "-crf", "12"]},
+    "preview": {"width": 540, "height": 960, "encode": ["-preset", PREVIEW_X264_PRESET, "-crf", PREVIEW_X264_CRF],
+                "mezzanine": ["-preset", "ultrafast", "-crf", "18"]},
+}
+
+
+# Smart trim: stream-copy the GOPs fully inside the trim range and re-encode only
+# the partial GOPs at its edges. SMART_TRIM=0 re-encodes the whole range.
+SMART_TRIM = os.getenv("SMART_TRIM", "1") != "0"
+# How far past each edge to look for the keyframe to switch to stream copy
+SMART_TRIM_PROBE_SECONDS = float(os.getenv("SMART_TRIM_PROBE_SECONDS", "20"))
+
+
+def vertical_crop_filter(quality: str = "final") -> str:
+    """
+    Vertical 9:16 center crop at the profile's resolution (final: scale=-1:1920,crop=1080:1920).
+    """
+    profile = QUALITY_PROFILES[quality]
+    return f"scale=-1:{profile['height']},crop={profile['width']}:{profile['height']}"
+
+
 class VideoProcessor:
     def __init__(self, upload_dir: str = "uploads", output_dir: str = "processed"):
         self.upload_dir = Path(upload_dir)
@@ -56,6 +167,7 @@ class VideoProcessor:
                 "-c:a", "copy",
                 str(output_path)
             ]
+            encode_at = command.index("-c:a")
             
         elif watermark_image:
             # PNG watermark using overlay filter
@@ -77,14 +189,18 @@ class VideoProcessor:
                 "-c:a", "copy",
                 str(output_path)
             ]
+            encode_at = command.index("-c:a")
         else:
             # No watermark, just copy
             shutil.copy(str(video_path), str(output_path))
             return str(output_path)
         
         try:
-            print(f"Adding watermark: {' '.join(command)}")
-            subprocess.run(command, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            with cpu_governor.lease() as threads:
+                command[encode_at:encode_at] = self._x264_args(QUALITY_PROFILES["final"]["encode"], threads)
+                command[1:1] = self._thread_args(threads)
+                print(f"Adding watermark: {' '.join(command)}")
+                self._run_ffmpeg(command)
             return str(output_path)
         except subprocess.CalledProcessError as e:
             print(f"Error adding watermark: {e}")
@@ -135,18 +251,77 @@ class VideoProcessor:
         ]
         
         try:
-            subprocess.run(command, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            self._run_ffmpeg(command)
             return str(output_audio_path)
         except subprocess.CalledProcessError as e:
             print(f"Error extracting audio: {e}")
             raise
 
-    def generate_word_level_srt(self, segments: list, output_path: str, start_offset: float = 0.0):
+    def decode_audio(self, input_path: str, output_pcm_path: str = None) -> str:
+        """
+        Decodes the first audio track once to raw 16 kHz mono float32 PCM (see services.audio).
+        Every downstream reader (local Whisper, energy, silence detection) memory-maps
+        this file, so there is no compressed intermediate to encode and decode again.
+        """
+        input_path = Path(input_path)
+        if not output_pcm_path:
+            output_pcm_path = self.output_dir / f"{input_path.stem}{PCM_SUFFIX}"
+
+        command = [
+            self.ffmpeg_path, "-y", "-i", str(input_path),
+            "-map", "a:0", *self._pcm_output_args(),
+            str(output_pcm_path)
+        ]
+
+        try:
+            self._run_ffmpeg(command)
+            return str(output_pcm_path)
+        except subprocess.CalledProcessError as e:
+            print(f"Error decoding audio: {e}")
+            raise
+
+    def encode_pcm_for_upload(self, pcm_path: str, output_audio_path: str) -> str:
+        """
+        Compresses decoded PCM to MP3 for APIs that need an upload (OpenAI Whisper).
+        64 kbit/s is plenty for 16 kHz mono speech and keeps ~50 minutes under the 25 MB limit.
+        """
+        command = [
+            self.ffmpeg_path, "-y",
+            "-f", "f32le", "-ar", str(SAMPLE_RATE), "-ac", "1", "-i", str(pcm_path),
+            "-b:a", "64k",
+            str(output_audio_path)
+        ]
+        self._run_ffmpeg(command)
+        return str(output_audio_path)
+
+    def open_audio_tap(self, output_pcm_path: str) -> "AudioTap":
+        """
+        Starts an FFmpeg process that decodes the audio track from container bytes
+        written to it while a download is still in progress (see AudioTap).
+        Produces the same PCM as decode_audio.
+        """
+        command = [
+            self.ffmpeg_path, "-y",
+            "-i", "pipe:0",
+            "-map", "a:0", *self._pcm_output_args(),
+            str(output_pcm_path)
+        ]
+        return AudioTap(command, str(output_pcm_path))
+
+    def _pcm_output_args(self) -> list:
+        return ["-vn", "-ac", "1", "-ar", str(SAMPLE_RATE), "-f", "f32le"]
+
+    def generate_word_level_srt(self, segments: list, output_path: str, start_offset: float = 0.0,
+                                end_time: float = None, transcript_index: TranscriptIndex = None):
         """
         Generates an SRT file with fast-paced (word-level or small group) captions.
         segments: List of segment objects from Whisper verbose_json.
         start_offset: The start time of the video clip relative to the original video.
                         We subtract this from the transcript timestamps.
+        end_time: End of the clip in the original video; only words inside
+                  [start_offset, end_time] are written (None: to the end of the transcript).
+        transcript_index: Word index of the transcript (TranscriptIndex), built once per job
+                  and shared by all its clips. Built from segments when omitted.
         """
         def format_timestamp(seconds: float):
             # SRT format: HH:MM:SS,ms
@@ -160,41 +335,22 @@ class VideoProcessor:
         entries = []
         counter = 1
 
-        # Flatten all words if available, otherwise just use segments
-        all_words = []
-        for seg in segments:
-            if "words" in seg:
-                all_words.extend(seg["words"])
-            else:
-                # Fallback if no word level info: treat the whole segment as one (not ideal for shorts)
-                all_words.append({
-                    "word": seg["text"],
-                    "start": seg["start"],
-                    "end": seg["end"]
-                })
-
-        # Group words? For now, let's do 1-2 words per line for that "snappy" feel
-        # or just 1 word if it's long? Let's do a simple greedy grouper: max 20 chars or 0.5 sec gap
-        
-        current_group = []
-        
-        for word_obj in all_words:
-            w_start = word_obj["start"] - start_offset
-            w_end = word_obj["end"] - start_offset
-            text = word_obj["word"].strip()
-
-            # Filter out things outside the clip
-            # We assume we only got segments relevant to the clip, but double check keys
-            if w_end < 0: continue
-            
-            # If start is negative but end is positive, clamp start
-            if w_start < 0: w_start = 0
+        # Words of this clip only (segments without word timings count as one word)
+        if transcript_index is None:
+            transcript_index = TranscriptIndex(segments)
+        clip_words = transcript_index.words_between(start_offset, end_time)
+        clip_length = None if end_time is None else end_time - start_offset
 
-            # Simple logic: One word per line for maximum impact (users love this for shorts)
-            # To make it slightly readable fast, maybe 1-2 words.
-            # Let's stick to 1 word for "Karaoke" feel unless it's very short 'a', 'the', etc.
-            
-            entries.append((w_start, w_end, text))
+        # Simple logic: One word per line for maximum impact (users love this for shorts)
+        # To make it slightly readable fast, maybe 1-2 words.
+        # Let's stick to 1 word for "Karaoke" feel unless it's very short 'a', 'the', etc.
+        for word_obj in clip_words:
+            # If start is negative but end is positive, clamp start (and the end to the clip)
+            w_start = max(0.0, word_obj["start"] - start_offset)
+            w_end = word_obj["end"] - start_offset
+            if clip_length is not None:
+                w_end = min(w_end, clip_length)
+            entries.append((w_start, w_end, word_obj["word"].strip()))
 
         with open(output_path, "w", encoding="utf-8") as f:
             for start, end, text in entries:
@@ -208,10 +364,18 @@ class VideoProcessor:
     def trim_source_video(self, video_path: str, output_path: str, start_time: float, end_time: float = None) -> str:
         """
         Trims the source video to a specific range. 
-        Uses stream copy (-c copy) for speed if possible, but -ss before -i for fast seek.
+        Uses a smart trim (stream copy between the edge keyframes) when the source allows it,
+        otherwise re-encodes the range.
         """
         video_path = Path(video_path)
         output_path = Path(output_path)
+
+        if SMART_TRIM:
+            try:
+                if self._smart_trim(video_path, output_path, start_time or 0.0, end_time):
+                    return str(output_path)
+            except Exception as e:
+                print(f"Smart trim failed, re-encoding instead: {e}")
         
         command = [self.ffmpeg_path, "-y"]
         
@@ -235,40 +399,149 @@ class VideoProcessor:
         # but maybe use a fast preset? 
         # Actually downstream (whisper, etc) handles audio.
         # Let's use re-encoding to ensure valid timestamps and keyframes for precise cuts later.
-        command.extend(["-c:v", "libx264", "-preset", "fast", "-c:a", "aac"])
-        
-        command.append(str(output_path))
-        
-        print(f"Trimming source: {' '.join(command)}")
-        subprocess.run(command, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        with cpu_governor.lease() as threads:
+            command[1:1] = self._thread_args(threads)
+            command.extend([*self._x264_args(["-preset", TRIM_X264_PRESET], threads), "-c:a", "aac"])
+
+            command.append(str(output_path))
+
+            print(f"Trimming source: {' '.join(command)}")
+            self._run_ffmpeg(command)
         return str(output_path)
 
-    def cut_video(self, video_path: str, start_time: float, end_time: float, output_path: str = None, subtitle_path: str = None, style_name: str = "Classic", force_style_string: str = None) -> str:
+    def _smart_trim(self, video_path: Path, output_path: Path, start_time: float, end_time: float = None) -> bool:
+        """
+        Re-encodes [start, first keyframe) and [last keyframe, end), stream-copies the GOPs in
+        between, and joins the pieces with the concat demuxer. Every piece carries its SPS/PPS
+        in-band, so the re-encoded edges and the copied middle may use different encoder
+        settings. Audio is re-encoded for the whole range, which keeps it sample-accurate. Returns False when the source does not
+        allow it (not H.264, or no keyframe near an edge); the caller then re-encodes.
+        """
+        if self.video_codec(video_path) != "h264":
+            return False
+
+        head_keys = self.keyframe_times(video_path, start_time, SMART_TRIM_PROBE_SECONDS)
+        if not head_keys:
+            return False
+        copy_start = head_keys[0]
+        copy_end = None
+        if end_time:
+            probe_from = max(copy_start, end_time - SMART_TRIM_PROBE_SECONDS)
+            tail_keys = [t for t in self.keyframe_times(video_path, probe_from, end_time - probe_from) if t <= end_time]
+            if not tail_keys or tail_keys[-1] <= copy_start:
+                return False
+            copy_end = tail_keys[-1]
+
+        print(f"Smart trim: stream-copying {copy_start}-{copy_end or 'end'}, re-encoding only the edges")
+        with tempfile.TemporaryDirectory(prefix="smart_trim_", dir=str(output_path.parent)) as tmp:
+            tmp = Path(tmp)
+            pieces = []  # (path, duration or None)
+
+            if copy_start - start_time > 0.001:
+                head = tmp / "head.mkv"
+                self._encode_trim_piece(video_path, head, start_time, copy_start - start_time)
+                pieces.append((head, copy_start - start_time))
+
+            middle = tmp / "middle.mkv"
+            # Seeking (backward) to just past the keyframe lands exactly on it
+            command = [self.ffmpeg_path, "-y", "-ss", str(copy_start + 0.0005), "-i", str(video_path)]
+            # Annex B carries SPS/PPS in-band with each keyframe
+            bitstream_filters = "h264_mp4toannexb"
+            if copy_end is not None:
+                # Stream copy stops on DTS, which lets B-frames shown after the last keyframe
+                # through; drop everything from that keyframe on by PTS instead
+                command.extend(["-t", str(copy_end - copy_start + 1)])
+                bitstream_filters += f",noise=drop=gte(pts*tb\\,{copy_end - copy_start - 0.002:.6f})"
+            command.extend(["-map", "0:v:0", "-an", "-sn", "-c:v", "copy", "-bsf:v", bitstream_filters, str(middle)])
+            self._run_ffmpeg(command)
+            pieces.append((middle, None if copy_end is None else copy_end - copy_start))
+
+            if copy_end is not None and end_time - copy_end > 0.001:
+                tail = tmp / "tail.mkv"
+                self._encode_trim_piece(video_path, tail, copy_end, end_time - copy_end)
+                pieces.append((tail, None))
+
+            concat_list = tmp / "pieces.txt"
+            with open(concat_list, "w", encoding="utf-8") as f:
+                for path, duration in pieces:
+                    # The concat demuxer resolves relative entries against the list's own
+                    # directory, not the working directory
+                    f.write(f"file '{path.resolve().as_posix()}'\n")
+                    if duration is not None:
+                        f.write(f"duration {duration:.6f}\n")
+
+            command = [self.ffmpeg_path, "-y", "-f", "concat", "-safe", "0", "-i", str(concat_list)]
+            has_audio = self.has_audio_stream(str(video_path))
+            if has_audio:
+                command.extend(["-ss", str(start_time), "-i", str(video_path)])
+                if end_time:
+                    command.extend(["-t", str(end_time - start_time)])
+            command.extend(["-map", "0:v:0"])
+            if has_audio:
+                command.extend(["-map", "1:a:0", "-c:a", "aac"])
+            command.extend(["-c:v", "copy", str(output_path)])
+            self._run_ffmpeg(command)
+        return True
+
+    def _encode_trim_piece(self, video_path: Path, output_path: Path, start_time: float, duration: float):
+        with cpu_governor.lease() as threads:
+            command = [
+                self.ffmpeg_path, "-y", *self._thread_args(threads),
+                "-ss", str(start_time), "-i", str(video_path), "-t", str(duration),
+                "-map", "0:v:0", "-an", "-sn",
+                # No B-frames: the piece's DTS must not reach back into the previous piece
+                *self._x264_args(["-preset", TRIM_X264_PRESET, "-bf", "0"], threads),
+                "-bsf:v", "dump_extra", str(output_path)
+            ]
+            self._run_ffmpeg(command)
+
+    def video_codec(self, video_path: str) -> str:
+        """
+        Codec name of the first video stream (parsed from ffmpeg's input banner), or None.
+        """
+        result = subprocess.run(
+            [self.ffmpeg_path, "-hide_banner", "-i", str(video_path)],
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, errors="replace"
+        )
+        match = re.search(r"Stream #\d+:\d+.*: Video: (\w+)", result.stderr)
+        return match.group(1) if match else None
+
+    def keyframe_times(self, video_path: str, start_time: float, duration: float) -> list:
+        """
+        Timestamps (seconds, source timeline) of the keyframes in [start, start + duration].
+        Only keyframes are decoded, so probing a window costs a handful of frames.
+        """
+        command = [
+            self.ffmpeg_path, "-hide_banner", "-nostats",
+            "-skip_frame", "nokey",
+            "-ss", str(start_time), "-t", str(duration),
+            "-i", str(video_path),
+            "-map", "0:v:0", "-an", "-sn",
+            "-vf", "showinfo", "-f", "null", "-"
+        ]
+        with track_ffmpeg():
+            result = subprocess.run(command, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, errors="replace")
+        # Output timestamps restart at the seek point
+        return [round(start_time + float(t), 6) for t in re.findall(r"pts_time:\s*([\d.]+)", result.stderr)]
+
+    def cut_video(self, video_path: str, start_time: float, end_time: float, output_path: str = None, subtitle_path: str = None, style_name: str = "Classic", force_style_string: str = None, progress_callback=None, quality: str = "final") -> str:
         """
         Cuts a video segment using FFmpeg.
         start_time and end_time should be floats (seconds).
         If subtitle_path is provided, burns subtitles into the video using the specified style.
         force_style_string: Optional. If present, overrides style_name with this raw FFmpeg style string.
+        progress_callback: Optional. Called with the encoded fraction (0.0-1.0) while FFmpeg runs.
+        quality: "final" (1080x1920) or "preview" (540x960, ultrafast), see QUALITY_PROFILES.
         """
         video_path = Path(video_path)
         if not output_path:
             output_path = self.output_dir / f"{video_path.stem}_cut.mp4"
 
         # -vf scale=-1:1920,crop=1080:1920 is for vertical 9:16 crop (center)
-        vf_filters = ["scale=-1:1920,crop=1080:1920"]
+        vf_filters = [vertical_crop_filter(quality)]
         
         if subtitle_path:
-            # FFmpeg requires escaping for Windows paths in filter arguments
-            escaped_sub_path = str(Path(subtitle_path).absolute()).replace("\\", "/").replace(":", "\\:")
-            
-            # Get style string
-            if force_style_string:
-                style_str = force_style_string
-            else:
-                style_str = STYLE_MAP.get(style_name, STYLE_MAP["Classic"])
-            
-            # force_style applies these styles to ALL subtitles in the file
-            vf_filters.append(f"subtitles='{escaped_sub_path}':force_style='{style_str}'")
+            vf_filters.append(self._subtitle_filter(subtitle_path, style_name, force_style_string))
 
         filter_complex = ",".join(vf_filters)
 
@@ -281,22 +554,212 @@ class VideoProcessor:
         
         duration = end_time - start_time
         
-        command = [
-            self.ffmpeg_path, 
-            "-ss", str(start_time),
-            "-i", str(video_path),
-            "-t", str(duration),
-            "-vf", filter_complex,
-            "-c:v", "libx264", "-c:a", "aac",
-            str(output_path), "-y"
-        ]
-
         try:
-            print(f"Running FFmpeg: {' '.join(command)}")
-            subprocess.run(command, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            with cpu_governor.lease() as threads:
+                command = [
+                    self.ffmpeg_path, *self._thread_args(threads),
+                    "-ss", str(start_time),
+                    "-i", str(video_path),
+                    "-t", str(duration),
+                    "-vf", filter_complex,
+                    *self._x264_args(QUALITY_PROFILES[quality]["encode"], threads), "-c:a", "aac",
+                    str(output_path), "-y"
+                ]
+                print(f"Running FFmpeg: {' '.join(command)}")
+                self._run_ffmpeg(command, duration=duration, progress_callback=progress_callback)
             return str(output_path)
         except subprocess.CalledProcessError as e:
             print(f"Error cutting video: {e}")
             raise
 
+    def cut_mezzanine(self, video_path: str, start_time: float, end_time: float, output_path: str, quality: str = "final") -> str:
+        """
+        Cuts and crops a segment to 9:16 without captions, encoded near-losslessly
+        so restyles only have to burn subtitles onto it (see burn_subtitles).
+        """
+        duration = end_time - start_time
+        with cpu_governor.lease() as threads:
+            command = [
+                self.ffmpeg_path, *self._thread_args(threads),
+                "-ss", str(start_time),
+                "-i", str(video_path),
+                "-t", str(duration),
+                "-vf", vertical_crop_filter(quality),
+                *self._x264_args(QUALITY_PROFILES[quality]["mezzanine"], threads), "-c:a", "aac",
+                str(output_path), "-y"
+            ]
+            print(f"Running FFmpeg: {' '.join(command)}")
+            self._run_ffmpeg(command, duration=duration)
+        return str(output_path)
+
+    def burn_subtitles(self, clip_path: str, subtitle_path: str, output_path: str, style_name: str = "Classic", force_style_string: str = None, quality: str = "final") -> str:
+        """
+        Burns an SRT onto an already cropped clip (a mezzanine). Audio is copied as is.
+        """
+        with cpu_governor.lease() as threads:
+            command = [
+                self.ffmpeg_path, *self._thread_args(threads),
+                "-i", str(clip_path),
+                "-vf", self._subtitle_filter(subtitle_path, style_name, force_style_string),
+                *self._x264_args(QUALITY_PROFILES[quality]["encode"], threads), "-c:a", "copy",
+                str(output_path), "-y"
+            ]
+            print(f"Running FFmpeg: {' '.join(command)}")
+            self._run_ffmpeg(command)
+        return str(output_path)
+
+    def cut_videos_batch(self, video_path: str, clips: list, style_name: str = "Classic", force_style_string: str = None, quality: str = "final") -> list:
+        """
+        Renders several clips of the same source with a single FFmpeg invocation.
+        clips: list of dicts with "start", "end", "output_path" and optional "subtitle_path".
+        The source is seeked once to the earliest start and decoded once up to the latest end;
+        a split/trim branch per clip applies its own crop and subtitle chain and feeds its own output.
+        Worth it when clips sit close together or overlap; for clips far apart prefer cut_video,
+        otherwise the gaps between them are decoded for nothing.
+        Returns the output paths in the order of clips.
+        """
+        video_path = Path(video_path)
+        if not clips:
+            return []
+
+        range_start = min(clip["start"] for clip in clips)
+        range_end = max(clip["end"] for clip in clips)
+        has_audio = self.has_audio_stream(str(video_path))
+        count = len(clips)
+
+        # With -ss before -i timestamps restart at 0, so every trim is relative to range_start
+        graph = [f"[0:v]split={count}" + "".join(f"[vin{i}]" for i in range(count))]
+        if has_audio:
+            graph.append(f"[0:a]asplit={count}" + "".join(f"[ain{i}]" for i in range(count)))
+
+        for i, clip in enumerate(clips):
+            rel_start = clip["start"] - range_start
+            rel_end = clip["end"] - range_start
+            # setpts restarts each branch at 0 so the clip-relative SRT lines up
+            chain = [f"trim=start={rel_start}:end={rel_end}", "setpts=PTS-STARTPTS", vertical_crop_filter(quality)]
+            if clip.get("subtitle_path"):
+                chain.append(self._subtitle_filter(clip["subtitle_path"], style_name, force_style_string))
+            graph.append(f"[vin{i}]" + ",".join(chain) + f"[vout{i}]")
+            if has_audio:
+                graph.append(f"[ain{i}]atrim=start={rel_start}:end={rel_end},asetpts=PTS-STARTPTS[aout{i}]")
+
+        try:
+            with cpu_governor.lease() as threads:
+                command = [
+                    self.ffmpeg_path, "-y", *self._thread_args(threads),
+                    "-ss", str(range_start),
+                    "-i", str(video_path),
+                    "-t", str(range_end - range_start),
+                    "-filter_complex", ";".join(graph)
+                ]
+                # The lease covers the whole process; its encoders split it
+                encoder_threads = max(1, threads // count)
+                for i, clip in enumerate(clips):
+                    # Filtergraph outputs carry no frame rate; without passthrough the muxer
+                    # assumes 25 fps and drops frames from 30/60 fps sources
+                    command.extend(["-map", f"[vout{i}]", "-fps_mode:v:0", "passthrough"])
+                    if has_audio:
+                        command.extend(["-map", f"[aout{i}]"])
+                    command.extend([*self._x264_args(QUALITY_PROFILES[quality]["encode"], encoder_threads), "-c:a", "aac", str(clip["output_path"])])
+
+                print(f"Running FFmpeg (batch of {count}): {' '.join(command)}")
+                self._run_ffmpeg(command)
+            return [str(clip["output_path"]) for clip in clips]
+        except subprocess.CalledProcessError as e:
+            print(f"Error cutting video batch: {e}")
+            raise
+
+    def _thread_args(self, threads: int) -> list:
+        """
+        Global/input options capping FFmpeg's filter and decoder threads. Goes right after
+        the binary, so -threads applies to the first input.
+        """
+        return ["-filter_threads", str(threads), "-filter_complex_threads", str(threads), "-threads", str(threads)]
+
+    def _x264_args(self, encode: list, threads: int) -> list:
+        """
+        libx264 with the given preset/CRF options, held to `threads` (a cpu_governor lease).
+        """
+        return [
+            "-c:v", "libx264", *encode, "-threads", str(threads),
+            "-x264-params", f"lookahead-threads={max(1, threads // 4)}"
+        ]
+
+    def _run_ffmpeg(self, command: list, duration: float = None, progress_callback=None):
+        """
+        Runs an FFmpeg command, counted in the in-flight FFmpeg gauge. With a progress_callback, FFmpeg's -progress output is
+        parsed and the callback receives out_time / duration as it advances.
+        Raises CalledProcessError (with stderr attached) on failure, like subprocess.run(check=True).
+        """
+        if not progress_callback or not duration:
+            with track_ffmpeg():
+                subprocess.run(command, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            return
+
+        command = [command[0], "-progress", "pipe:1", "-nostats"] + command[1:]
+        # stderr goes to a temp file so a chatty encoder can never fill the pipe and stall us
+        with tempfile.TemporaryFile() as stderr_file, track_ffmpeg():
+            process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=stderr_file, text=True)
+            for line in process.stdout:
+                key, _, value = line.strip().partition("=")
+                # out_time=HH:MM:SS.micro (out_time_ms is actually microseconds on most builds)
+                if key == "out_time" and value.count(":") == 2:
+                    try:
+                        hours, minutes, seconds = value.split(":")
+                        elapsed = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+                    except ValueError:
+                        continue
+                    progress_callback(max(0.0, min(1.0, elapsed / duration)))
+            returncode = process.wait()
+            if returncode != 0:
+                stderr_file.seek(0)
+                raise subprocess.CalledProcessError(returncode, command, stderr=stderr_file.read())
+
+    def decode_gray_frames(self, video_path: str, width: int, height: int, fps: float):
+        """
+        Decodes the video once into tiny grayscale frames for visual analysis (scene index).
+        Non-reference frames and deblocking are skipped at the decoder and the rest is
+        decimated to `fps`, so this runs many times faster than realtime. Returns a (frames, height, width) uint8 array.
+        """
+        import numpy as np
+        command = [
+            self.ffmpeg_path, "-v", "error",
+            "-skip_frame", "noref", "-skip_loop_filter", "all", "-flags2", "fast",
+            "-i", str(video_path),
+            "-an", "-sn",
+            "-vf", f"fps={fps},scale={width}:{height}:flags=area,format=gray",
+            "-f", "rawvideo", "pipe:1"
+        ]
+        with track_ffmpeg():
+            result = subprocess.run(command, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        frame_size = width * height
+        count = len(result.stdout) // frame_size
+        return np.frombuffer(result.stdout, dtype=np.uint8, count=count * frame_size).reshape(count, height, width)
+
+    def has_audio_stream(self, video_path: str) -> bool:
+        """
+        Checks whether the file has at least one audio stream (parsed from ffmpeg's input banner).
+        """
+        result = subprocess.run(
+            [self.ffmpeg_path, "-hide_banner", "-i", str(video_path)],
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, errors="replace"
+        )
+        return re.search(r"Stream #\d+:\d+.*: Audio:", result.stderr) is not None
+
+    def _subtitle_filter(self, subtitle_path: str, style_name: str = "Classic", force_style_string: str = None) -> str:
+        """
+        Builds the subtitles= filter that burns an SRT with the given caption style.
+        """
+        # FFmpeg requires escaping for Windows paths in filter arguments
+        escaped_sub_path = str(Path(subtitle_path).absolute()).replace("\\", "/").replace(":", "\\:")
+        
+        # Get style string
+        if force_style_string:
+            style_str = force_style_string
+        else:
+            style_str = STYLE_MAP.get(style_name, STYLE_MAP["Classic"])
+        
+        # force_style applies these styles to ALL subtitles in the file
+        return f"subtitles='{escaped_sub_path}':force_style='{style_str}'"
+
 video_processor = VideoProcessor()
@@ -79,6 +79,7 @@ export default function UploadPage() {
     const [regenBgColor, setRegenBgColor] = useState<string>("#000000"); // Default BG
     const [regenSize, setRegenSize] = useState<number>(18);
     const [isRegenerating, setIsRegenerating] = useState(false);
+    const [previewUrl, setPreviewUrl] = useState<string | null>(null); // Fast 540x960 render of the current look
 
     // URL & Advanced Settings State
     const [uploadMode, setUploadMode] = useState<'file' | 'url'>('file');
@@ -95,6 +96,8 @@ export default function UploadPage() {
     const [rocketClip, setRocketClip] = useState<Clip | null>(null);
     const [rocketContent, setRocketContent] = useState<RocketContent | null>(null);
     const [loadingRocket, setLoadingRocket] = useState(false);
+    // Rocket content already generated for this job's clips, by clip range
+    const [rocketCache, setRocketCache] = useState<Record<string, RocketContent>>({});
     const [copiedField, setCopiedField] = useState<string | null>(null);
 
     const captionStyles = [
@@ -110,6 +113,7 @@ export default function UploadPage() {
             setFile(acceptedFiles[0]);
             setProgress(0);
             setClips([]); // Reset clips on new upload
+            setRocketCache({});
         }
     }, []);
 
@@ -126,6 +130,7 @@ export default function UploadPage() {
         setFile(null);
         setProgress(0);
         setClips([]);
+        setRocketCache({});
     };
 
     const parseTimeToSeconds = (timeStr: string) => {
@@ -183,10 +188,17 @@ export default function UploadPage() {
         })
             .then(res => res.json())
             .then(data => {
-                console.log("Processing complete:", data);
+                if (!data.job_id) {
+                    throw new Error(data.detail || "Processing could not be started.");
+                }
+                console.log("Processing job queued:", data.job_id);
+                return pollProcessJob(data.job_id);
+            })
+            .then(result => {
+                console.log("Processing complete:", result);
                 setProcessing(false);
-                if (data.clips && data.clips.length > 0) {
-                    setClips(data.clips);
+                if (result.clips && result.clips.length > 0) {
+                    setClips(result.clips);
                 } else {
                     alert("No clips were generated.");
                 }
@@ -198,8 +210,31 @@ export default function UploadPage() {
             });
     };
 
+    // Poll the background job until it finishes; clips are shown as soon as they are rendered.
+    const pollProcessJob = async (jobId: string) => {
+        while (true) {
+            await new Promise(resolve => setTimeout(resolve, 3000));
+            const res = await fetch(`${API_BASE_URL}/api/process/${jobId}`);
+            const job = await res.json();
+            if (!res.ok) {
+                throw new Error(job.detail || "Processing job not found.");
+            }
+
+            if (job.clips && job.clips.length > 0) {
+                setClips(job.clips);
+            }
+            if (job.status === "completed") {
+                return job.result || { clips: job.clips };
+            }
+            if (job.status === "failed") {
+                throw new Error(job.error || "Processing failed.");
+            }
+        }
+    };
+
     const handleUpload = async () => {
         setClips([]);
+        setRocketCache({});
 
         if (uploadMode === 'url') {
             if (!videoUrl) {
@@ -266,6 +301,7 @@ export default function UploadPage() {
 
     const openCustomize = (clip: Clip) => {
         setCustomizingClip(clip);
+        setPreviewUrl(null);
         // Default to current global style or 'Karaoke'
         setRegenStyle(captionStyle);
     };
@@ -317,7 +353,8 @@ export default function UploadPage() {
         }
     };
 
-    const handleRegenerate = async () => {
+    // "preview" renders a quick low-res proxy shown in the dialog; "final" renders full quality and replaces the clip
+    const handleRegenerate = async (quality: "preview" | "final") => {
         if (!customizingClip) return;
         setIsRegenerating(true);
 
@@ -345,10 +382,12 @@ export default function UploadPage() {
                 caption_style: regenStyle,
                 custom_color: regenColor,
                 custom_bg_color: regenBgColor,
-                custom_size: regenSize
+                custom_size: regenSize,
+                quality
             };
 
-            const res = await fetch(`${API_BASE_URL}/api/process/regenerate`, {
+            const endpoint = quality === "final" ? "finalize" : "regenerate";
+            const res = await fetch(`${API_BASE_URL}/api/process/${endpoint}`, {
                 method: "POST",
                 headers: { "Content-Type": "application/json" },
                 body: JSON.stringify(payload)
@@ -358,6 +397,11 @@ export default function UploadPage() {
 
             const data = await res.json();
 
+            if (quality === "preview") {
+                setPreviewUrl(data.url);
+                return;
+            }
+
             // Update the clip in the list
             setClips(prevClips => prevClips.map(c => {
                 if (c === customizingClip) {
@@ -376,25 +420,40 @@ export default function UploadPage() {
         }
     };
 
+    const rocketKey = (clip: Clip) => `${clip.start}-${clip.end}`;
+
     const openRocketShare = async (clip: Clip) => {
         setRocketClip(clip);
-        setRocketContent(null);
+        const cached = rocketCache[rocketKey(clip)];
+        setRocketContent(cached || null);
+        if (cached) return;
         setLoadingRocket(true);
 
         try {
-            const res = await fetch(`${API_BASE_URL}/api/rocket/generate`, {
+            // One request generates content for every clip still missing it, so later shares open instantly
+            const pending = [clip, ...clips.filter(c => c !== clip && !rocketCache[rocketKey(c)])];
+            const res = await fetch(`${API_BASE_URL}/api/rocket/generate-batch`, {
                 method: "POST",
                 headers: { "Content-Type": "application/json" },
                 body: JSON.stringify({
-                    clip_path: clip.path,
-                    clip_title: clip.title || "",
-                    clip_reason: clip.reason || ""
+                    clips: pending.map(c => ({
+                        clip_path: c.path,
+                        clip_title: c.title || "",
+                        clip_reason: c.reason || "",
+                        start: c.start,
+                        end: c.end
+                    }))
                 })
             });
 
             const data = await res.json();
-            if (data.success && data.content) {
-                setRocketContent(data.content);
+            if (data.success && data.results) {
+                const generated: Record<string, RocketContent> = {};
+                data.results.forEach((result: { content: RocketContent }, i: number) => {
+                    generated[rocketKey(pending[i])] = result.content;
+                });
+                setRocketCache(prev => ({ ...prev, ...generated }));
+                setRocketContent(generated[rocketKey(clip)] || null);
             }
         } catch (e) {
             console.error("Rocket content generation failed:", e);
@@ -859,6 +918,18 @@ export default function UploadPage() {
                             </DialogHeader>
 
                             <div className="space-y-4 py-4">
+                                {previewUrl && (
+                                    <div className="aspect-[9/16] max-h-64 mx-auto bg-black rounded-md overflow-hidden">
+                                        <video
+                                            key={previewUrl}
+                                            src={`${API_BASE_URL}${previewUrl}`}
+                                            controls
+                                            autoPlay
+                                            className="w-full h-full object-contain"
+                                        />
+                                    </div>
+                                )}
+
                                 <div className="space-y-2">
                                     <label className="text-sm font-medium">Style</label>
                                     <select
@@ -924,14 +995,17 @@ export default function UploadPage() {
                                 <Button variant="outline" onClick={() => setCustomizingClip(null)} disabled={isRegenerating}>
                                     Cancel
                                 </Button>
-                                <Button onClick={handleRegenerate} disabled={isRegenerating}>
+                                <Button variant="secondary" onClick={() => handleRegenerate("preview")} disabled={isRegenerating}>
+                                    <Wand2 className={`mr-2 h-4 w-4 ${isRegenerating ? "animate-spin" : ""}`} /> Preview
+                                </Button>
+                                <Button onClick={() => handleRegenerate("final")} disabled={isRegenerating}>
                                     {isRegenerating ? (
                                         <>
-                                            <Wand2 className="mr-2 h-4 w-4 animate-spin" /> Regenerating...
+                                            <Wand2 className="mr-2 h-4 w-4 animate-spin" /> Rendering...
                                         </>
                                     ) : (
                                         <>
-                                            <Wand2 className="mr-2 h-4 w-4" /> Regenerate Video
+                                            <Wand2 className="mr-2 h-4 w-4" /> Finalize Video
                                         </>
                                     )}
                                 </Button>